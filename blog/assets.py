@@ -0,0 +1,270 @@
+import functools
+import hashlib
+import json
+import logging
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from output import OutputWriter
+
+logger = logging.getLogger(__name__)
+
+# Static files that get content-hashed names and can be cached forever
+FINGERPRINT_SUFFIXES = {".css", ".js"}
+
+# Outputs that get .gz (and .zst) siblings
+COMPRESSIBLE_SUFFIXES = {".html", ".css", ".js", ".json", ".svg"}
+
+ASSET_REF_RE = re.compile(r"""(\b(?:href|src)=)(["'])(/[^"']+)\2""")
+
+ASSET_MANIFEST_NAME = "asset-manifest.json"
+
+TAG_URL_RE = re.compile(r"""\b(?:href|src)=["']([^"']+)["']""")
+
+
+@dataclass(frozen=True)
+class ClientFeature:
+    """
+    A client-side feature that only some pages need, with the tags that load it.
+
+    A page uses the feature when its content contains any of `markers`.
+    `head` tags go into the template's `{{ head_assets }}` slot and `body`
+    tags into `{{ body_assets }}`.
+    """
+
+    name: str
+    markers: Tuple[str, ...]
+    head: Tuple[str, ...] = ()
+    body: Tuple[str, ...] = ()
+
+
+CLIENT_FEATURES = (
+    # code.css styles every <pre>/<code>, not just highlighted blocks
+    ClientFeature(
+        name="code",
+        markers=("<pre", "<code"),
+        head=('<link rel="stylesheet" href="/code.css" />',),
+    ),
+    ClientFeature(
+        name="mermaid",
+        markers=('class="mermaid"',),
+        head=(
+            '<script defer src="https://cdnjs.cloudflare.com/ajax/libs/mermaid/11.12.0/mermaid.min.js" '
+            'integrity="sha512-5TKaYvhenABhlGIKSxAWLFJBZCSQw7HTV7aL1dJcBokM/+3PNtfgJFlv8E6Us/B1VMlQ4u8sPzjudL9TEQ06ww==" '
+            'crossorigin="anonymous" referrerpolicy="no-referrer"></script>',
+        ),
+        body=('<script defer src="/mermaid-init.js"></script>',),
+    ),
+    ClientFeature(
+        name="search",
+        markers=('id="search-input"',),
+        body=('<script defer src="/search.js"></script>',),
+    ),
+)
+
+
+# zstd modules in order of preference; `compression.zstd` is Python 3.14+
+ZSTD_MODULES = ("compression.zstd", "zstandard")
+
+
+@functools.cache
+def _zstd_module() -> str | None:
+    """
+    Return the name of the first installed zstd module without importing it.
+    """
+    import importlib.util
+
+    for name in ZSTD_MODULES:
+        try:
+            if importlib.util.find_spec(name) is not None:
+                return name
+        except ImportError:  # parent package missing
+            continue
+    return None
+
+
+def _zstd_compressor() -> Callable[[bytes], bytes] | None:
+    import importlib
+
+    name = _zstd_module()
+    if name is None:
+        return None
+    module = importlib.import_module(name)
+    if name == "zstandard":
+        return module.ZstdCompressor(level=19).compress
+    return lambda data: module.compress(data, level=19)
+
+
+def encoding_names() -> List[str]:
+    """
+    Return the names of the available content encodings, in order of
+    preference, without importing any compressor.
+    """
+    return ["zstd", "gzip"] if _zstd_module() is not None else ["gzip"]
+
+
+def encoders() -> Dict[str, Callable[[bytes], bytes]]:
+    """
+    Return the available content encodings (name → compress function), in
+    order of preference.  zstd is only offered when a zstd module is installed.
+    """
+    import gzip
+
+    available = {}
+    zstd_compress = _zstd_compressor()
+    if zstd_compress is not None:
+        available["zstd"] = zstd_compress
+    # mtime=0 keeps the output identical across builds
+    available["gzip"] = lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    return available
+
+
+ENCODING_SUFFIXES = {"zstd": ".zst", "gzip": ".gz"}
+
+
+def fingerprinted_name(path: Path, digest: str) -> str:
+    return f"{path.stem}.{digest[:10]}{path.suffix}"
+
+
+def fingerprint_assets(
+    static_dir: Path, output_dir: Path, writer: OutputWriter
+) -> Dict[str, str]:
+    """
+    Publish each CSS/JS file in *static_dir* under a content-hashed name.
+
+    Returns a mapping from the plain URL (e.g. `/styles.css`) to the
+    fingerprinted one (e.g. `/styles.3f2a9c01de.css`).  Fingerprinted copies
+    of files that no longer exist are removed.
+    """
+    mapping = {}
+    published = set()
+    for path in sorted(static_dir.rglob("*")):
+        if not path.is_file() or path.suffix not in FINGERPRINT_SUFFIXES:
+            continue
+        rel = path.relative_to(static_dir)
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        out_rel = rel.with_name(fingerprinted_name(rel, digest))
+        writer.sync_file(path, output_dir / out_rel, source="fingerprint")
+        published.add(output_dir / out_rel)
+        mapping["/" + rel.as_posix()] = "/" + out_rel.as_posix()
+    writer.prune("fingerprint", published)
+    return mapping
+
+
+def rewrite_asset_refs(html_text: str, mapping: Dict[str, str]) -> str:
+    """
+    Point `href`/`src` attributes at the fingerprinted asset URLs in *mapping*.
+    """
+
+    def _repl(match: re.Match) -> str:
+        url = mapping.get(match.group(3))
+        if url is None:
+            return match.group(0)
+        return f"{match.group(1)}{match.group(2)}{url}{match.group(2)}"
+
+    return ASSET_REF_RE.sub(_repl, html_text)
+
+
+def detect_features(content: str | Iterable[str]) -> List[str]:
+    """
+    Return the names of the client features *content* uses, in
+    `CLIENT_FEATURES` order.
+    """
+    if not isinstance(content, str):
+        content = "".join(content)
+    return [
+        feature.name
+        for feature in CLIENT_FEATURES
+        if any(marker in content for marker in feature.markers)
+    ]
+
+
+def feature_slots(features: List[str], asset_urls: Dict[str, str]) -> Dict[str, str]:
+    """
+    Return the `head_assets`/`body_assets` template values for *features*, with
+    local URLs pointing at their fingerprinted names.
+    """
+    head, body = [], []
+    for feature in CLIENT_FEATURES:
+        if feature.name in features:
+            head.extend(feature.head)
+            body.extend(feature.body)
+    return {
+        "head_assets": rewrite_asset_refs("\n    ".join(head), asset_urls),
+        "body_assets": rewrite_asset_refs("\n    ".join(body), asset_urls),
+    }
+
+
+def write_asset_manifest(
+    pages: Dict[str, List[str]],
+    asset_urls: Dict[str, str],
+    output_dir: Path,
+    writer: OutputWriter,
+) -> None:
+    """
+    Record which features and asset URLs each page (keyed by output path) pulls.
+    """
+    manifest = {}
+    for page, features in sorted(pages.items()):
+        slots = feature_slots(features, asset_urls)
+        urls = TAG_URL_RE.findall(slots["head_assets"] + slots["body_assets"])
+        manifest[page] = {"features": features, "assets": urls}
+    writer.write_text(
+        output_dir / ASSET_MANIFEST_NAME, [json.dumps(manifest, indent=1) + "\n"]
+    )
+
+
+def precompress_outputs(output_dir: Path, writer: OutputWriter) -> None:
+    """
+    Write `.gz` (and `.zst`) siblings for every HTML/CSS/JS/JSON/SVG output.
+
+    Siblings record the hash of the output they were made from, so only new or
+    changed outputs are compressed; the compression itself runs on a thread
+    pool (zlib and zstd release the GIL).  The compressors are not even
+    imported when nothing changed.  Siblings of deleted outputs are removed.
+    """
+    jobs = []  # (output path, source hash, encoding)
+    for suffix in sorted(COMPRESSIBLE_SUFFIXES):
+        for path in sorted(output_dir.rglob(f"*{suffix}")):
+            if path.name.startswith(".") or not path.is_file():
+                continue
+            source_hash = writer.current_hash(path)
+            rel = path.relative_to(output_dir).as_posix()
+            for encoding in encoding_names():
+                sibling_suffix = ENCODING_SUFFIXES[encoding]
+                entry = writer.index.get(rel + sibling_suffix)
+                if entry and entry.get("of") == source_hash:
+                    if path.with_name(path.name + sibling_suffix).is_file():
+                        continue
+                jobs.append((path, source_hash, encoding))
+
+    available = encoders() if jobs else {}
+
+    def _compress(job) -> bytes:
+        path, _, encoding = job
+        return available[encoding](path.read_bytes())
+
+    results: List[bytes] = []
+    if jobs:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor() as pool:
+            results = list(pool.map(_compress, jobs))
+
+    for (path, source_hash, encoding), data in zip(jobs, results):
+        sibling = path.with_name(path.name + ENCODING_SUFFIXES[encoding])
+        writer.write_bytes(sibling, [data], source="precompress")
+        writer.index[sibling.relative_to(output_dir).as_posix()]["of"] = source_hash
+
+    for rel, entry in list(writer.index.items()):
+        if entry.get("source") != "precompress":
+            continue
+        base = output_dir / rel
+        base = base.with_name(base.name.rsplit(".", 1)[0])
+        if not base.is_file():
+            writer.remove(output_dir / rel)
+
+    if jobs:
+        logging.info(f"Precompressed {len(jobs)} outputs")
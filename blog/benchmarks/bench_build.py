@@ -0,0 +1,198 @@
+"""
+Stage-by-stage benchmark of the build pipeline on a synthetic corpus.
+
+Each stage of `ssg()` is timed separately over every post (best of
+`--repeat` runs) and written to a JSON report that later runs can be
+compared against.  Run from the `blog/` directory:
+
+    uv run benchmarks/bench_build.py --posts 200 --output bench.json
+    uv run benchmarks/bench_build.py --posts 200 --compare bench.json
+"""
+
+import argparse
+import json
+import logging
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from corpus import add_spec_arguments, generate_corpus, spec_from_args  # noqa: E402
+from images import compress_variants, discover_images  # noqa: E402
+from main import (  # noqa: E402
+    Config,
+    convert_markdown,
+    copy_static,
+    discover_pages,
+    extract_excerpt,
+    extract_front_matter,
+    generate_nav_links,
+    load_template,
+    parse_post,
+    render_pages,
+    render_posts,
+)
+from render import add_line_numbers  # noqa: E402
+
+REPORT_SCHEMA = 1
+
+
+def best_of(repeat: int, fn: Callable[[], object]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_stages(corpus_dir: Path, out_dir: Path, repeat: int) -> Dict[str, Dict]:
+    """
+    Time every build stage over the posts in *corpus_dir*, writing to *out_dir*.
+    """
+    config = Config()
+    post_dirs = sorted(p for p in corpus_dir.iterdir() if p.is_dir())
+    texts = [(p / "index.md").read_text(encoding="utf-8") for p in post_dirs]
+    bodies = [extract_front_matter(text)[1] for text in texts]
+    html = [convert_markdown(body) for body in bodies]
+    image_paths = [p / name for p in post_dirs for name in discover_images(p)]
+
+    template = load_template(config.template_path)
+    pages = discover_pages(config.pages_dir)
+    nav_links = generate_nav_links(pages)
+    posts = [parse_post(p.name, p) for p in post_dirs]
+    posts = sorted((p for p in posts if p), key=lambda p: p.date, reverse=True)
+
+    images_out = out_dir / "posts" / "images"
+    images_out.mkdir(parents=True, exist_ok=True)
+
+    stages: Dict[str, tuple[int, Callable[[], object]]] = {
+        "extract_front_matter": (
+            len(texts),
+            lambda: [extract_front_matter(text) for text in texts],
+        ),
+        "convert_markdown": (
+            len(bodies),
+            lambda: [convert_markdown(b) for b in bodies],
+        ),
+        "extract_excerpt": (len(html), lambda: [extract_excerpt(h) for h in html]),
+        "add_line_numbers": (len(html), lambda: [add_line_numbers(h) for h in html]),
+        "compress_images": (
+            len(image_paths),
+            lambda: [
+                compress_variants(src, images_out, config.image_widths, quality=85)
+                for src in image_paths
+            ],
+        ),
+        "render_posts": (
+            len(posts),
+            lambda: render_posts(posts, template, nav_links, out_dir / "posts"),
+        ),
+        "render_pages": (
+            len(pages),
+            lambda: render_pages(pages, posts, template, nav_links, out_dir),
+        ),
+        "copy_static": (1, lambda: copy_static(config.static_dir, out_dir)),
+    }
+
+    results = {}
+    for name, (items, fn) in stages.items():
+        seconds = best_of(repeat, fn)
+        results[name] = {
+            "seconds": seconds,
+            "items": items,
+            "per_item_ms": seconds * 1000 / items if items else 0.0,
+        }
+        print(f"{name:>22}: {seconds * 1000:10.2f} ms  ({items} items)", flush=True)
+    return results
+
+
+def compare(report: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    Print a comparison table and return the stages slower than *threshold*.
+    """
+    regressions = []
+    print(f"\n{'stage':>22}  {'baseline ms':>12}  {'current ms':>12}  ratio")
+    for name, current in report["stages"].items():
+        old = baseline.get("stages", {}).get(name)
+        if not old or not old["seconds"]:
+            print(f"{name:>22}  {'-':>12}  {current['seconds'] * 1000:12.2f}")
+            continue
+        ratio = current["seconds"] / old["seconds"]
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(
+            f"{name:>22}  {old['seconds'] * 1000:12.2f}  "
+            f"{current['seconds'] * 1000:12.2f}  {ratio:5.2f}x{flag}"
+        )
+        if ratio > threshold:
+            regressions.append(name)
+    if baseline.get("corpus") != report["corpus"]:
+        print("warning: baseline was recorded with a different corpus")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the build pipeline")
+    add_spec_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=3, help="Best-of repetitions")
+    parser.add_argument(
+        "--corpus", type=Path, help="Reuse (or create) the corpus in this directory"
+    )
+    parser.add_argument("--output", type=Path, help="Write the JSON report here")
+    parser.add_argument("--compare", type=Path, help="Baseline report to compare to")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.10,
+        help="Fail when a stage is slower than baseline by this factor",
+    )
+    args = parser.parse_args()
+    spec = spec_from_args(args)
+    # Per-post build logging (and the deliberate bad dates) would drown the table
+    logging.getLogger().setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory(prefix="blog-bench-") as tmp:
+        corpus_dir = args.corpus or Path(tmp) / "posts"
+        if not corpus_dir.is_dir() or not any(corpus_dir.iterdir()):
+            print(f"Generating {spec.posts} posts in {corpus_dir}", flush=True)
+            generate_corpus(corpus_dir, spec)
+        stages = run_stages(corpus_dir, Path(tmp) / "build", args.repeat)
+
+    report = {
+        "schema": REPORT_SCHEMA,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "corpus": asdict(spec),
+        "repeat": args.repeat,
+        "stages": stages,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"Wrote {args.output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Micro-benchmark for `render.add_line_numbers`.
+
+Compares the single-pass scanner against the previous two-regex
+implementation on synthetic documents and checks both produce identical
+output.  Run from the `blog/` directory:
+
+    uv run benchmarks/bench_line_numbers.py --blocks 500 --lines 40
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from render import add_line_numbers  # noqa: E402
+
+
+def legacy_add_line_numbers(html_content: str) -> str:
+    """
+    The two-pass regex implementation `add_line_numbers` replaced.
+    """
+
+    def add_lines_to_block(code_block: str) -> str:
+        lines = code_block.rstrip("\n").split("\n")
+        numbered_lines = [
+            f'<span class="ln">{i}</span>{line}' for i, line in enumerate(lines, 1)
+        ]
+        return "\n".join(numbered_lines)
+
+    def process(match: re.Match) -> str:
+        code_block = match.group(1)
+        if 'class="ln"' in code_block:
+            return match.group(0)
+        numbered = add_lines_to_block(code_block)
+        return f'<div class="codehilite"><pre><span></span><code>{numbered}</code></pre></div>'
+
+    html_content = re.sub(
+        r'<div class="codehilite">\s*<pre><span></span><code>(.*?)</code></pre>\s*</div>',
+        process,
+        html_content,
+        flags=re.DOTALL,
+    )
+    return re.sub(
+        r"<pre><code>(.*?)</code></pre>", process, html_content, flags=re.DOTALL
+    )
+
+
+def synthetic_document(blocks: int, lines: int, seed: int = 0) -> str:
+    """
+    Return an HTML document with *blocks* code blocks of *lines* lines each,
+    alternating highlighted and plain blocks with prose in between.
+    """
+    rng = random.Random(seed)
+    parts = []
+    for b in range(blocks):
+        parts.append(
+            f"<p>Paragraph {b} " + "lorem ipsum " * rng.randint(5, 40) + "</p>\n\n"
+        )
+        code = "\n".join(
+            f'<span class="k">def</span> <span class="nf">f{i}</span>(x): <span class="k">return</span> x * {i}'
+            for i in range(lines)
+        )
+        if b % 3 == 2:
+            parts.append(f"<pre><code>{code}\n</code></pre>\n\n")
+        else:
+            parts.append(
+                f'<div class="codehilite">\n<pre><span></span><code>{code}\n</code></pre>\n</div>\n\n'
+            )
+    return "".join(parts)
+
+
+def measure(fn, doc: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(doc)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--blocks", type=int, default=500, help="Code blocks per document"
+    )
+    parser.add_argument("--lines", type=int, default=40, help="Lines per code block")
+    parser.add_argument("--repeat", type=int, default=5, help="Best-of repetitions")
+    args = parser.parse_args()
+
+    doc = synthetic_document(args.blocks, args.lines)
+    expected = legacy_add_line_numbers(doc)
+    if add_line_numbers(doc) != expected:
+        sys.exit("add_line_numbers output differs from the legacy implementation")
+    if add_line_numbers(expected) != expected:
+        sys.exit("add_line_numbers is not idempotent")
+
+    size_mb = len(doc.encode("utf-8")) / 1e6
+    print(f"document: {args.blocks} blocks x {args.lines} lines, {size_mb:.2f} MB")
+    for name, fn in (
+        ("legacy", legacy_add_line_numbers),
+        ("single-pass", add_line_numbers),
+    ):
+        seconds = measure(fn, doc, args.repeat)
+        print(f"{name:>12}: {seconds * 1000:8.2f} ms  {size_mb / seconds:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
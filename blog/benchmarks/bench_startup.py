@@ -0,0 +1,245 @@
+"""
+Startup benchmark: how long `import main` takes, and how long a no-op build
+runs end to end.
+
+Heavy dependencies (markdown2, yaml, Pillow, Pygments, multiprocessing,
+aiohttp, watchfiles) are meant to load only in the stage that needs them.
+
+Both figures are measured on top of a baseline: a fresh interpreter that has
+imported `STDLIB_BASELINE`, the standard library modules the build itself
+is written against.  Interpreter start-up and stdlib import speed vary a lot
+between machines, so only the time spent beyond that baseline is budgeted.
+
+The script imports `main` in fresh interpreters, reports the best time,
+lists any heavy module that was loaded anyway and exits non-zero when the
+import exceeds `--budget` milliseconds.  A no-op build must not load a heavy
+module or a compressor either, and fails the run when its wall time minus
+the baseline exceeds `--noop-budget`.  Run from the `blog/` directory:
+
+    uv run benchmarks/bench_startup.py
+    uv run benchmarks/bench_startup.py --noop-posts 50
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+BLOG_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BLOG_DIR))
+
+from corpus import CorpusSpec, generate_corpus  # noqa: E402
+
+# Modules that must not be imported just by loading the build entry point
+HEAVY_MODULES = (
+    "PIL",
+    "aiohttp",
+    "concurrent.futures.process",
+    "markdown2",
+    "multiprocessing",
+    "pygments",
+    "watchfiles",
+    "yaml",
+)
+
+# A build where nothing changed must not load these either
+NOOP_HEAVY_MODULES = HEAVY_MODULES + ("gzip", "compression.zstd", "zstandard")
+
+# Standard library modules the build modules import at load time; their
+# cost is part of the baseline rather than the budget
+STDLIB_BASELINE = (
+    "collections",
+    "contextlib",
+    "dataclasses",
+    "datetime",
+    "functools",
+    "hashlib",
+    "html",
+    "json",
+    "logging",
+    "os",
+    "pathlib",
+    "re",
+    "shutil",
+    "tempfile",
+    "threading",
+    "time",
+    "typing",
+)
+
+BASELINE_PROBE = f"import {', '.join(STDLIB_BASELINE)}"
+
+PROBE = f"""
+{BASELINE_PROBE}
+import sys
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+loaded = sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules)
+print(json.dumps([elapsed * 1000, loaded]))
+"""
+
+
+def interpreter_env() -> dict:
+    # Measure warm starts: bytecode caches are allowed (and written by the
+    # first, discarded, run)
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+
+def imported_modules(importtime_output: str) -> List[str]:
+    """
+    Return the names of the modules listed in `-X importtime` output.
+    """
+    names = []
+    for line in importtime_output.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        fields = line.split("|")
+        if line.startswith("import time:") and len(fields) == 3:
+            names.append(fields[2].strip())
+    return names
+
+
+def measure_baseline(repeat: int) -> float:
+    """
+    Return the best wall time (ms) of starting an interpreter and importing
+    `STDLIB_BASELINE`.
+    """
+    command = [sys.executable, "-c", BASELINE_PROBE]
+    env = interpreter_env()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, env=env, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def import_once(cwd: Path) -> Tuple[float, List[str]]:
+    """
+    Import `main` in a fresh interpreter that already loaded the baseline and
+    return the import time in milliseconds together with the heavy modules it
+    pulled in.
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=cwd,
+        env=interpreter_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed, loaded = json.loads(result.stdout)
+    return elapsed, loaded
+
+
+def measure_import(repeat: int) -> Tuple[float, List[str]]:
+    import_once(BLOG_DIR)  # warm the bytecode cache
+    best, loaded = float("inf"), []
+    for _ in range(repeat):
+        elapsed, loaded = import_once(BLOG_DIR)
+        best = min(best, elapsed)
+    return best, loaded
+
+
+def measure_noop_build(posts: int, repeat: int) -> Tuple[float, List[str]]:
+    """
+    Build a synthetic site once, then return the best wall time (ms) of
+    rebuilding it with nothing changed, interpreter start-up included,
+    together with the heavy modules such a rebuild loads.
+    """
+    with tempfile.TemporaryDirectory(prefix="blog-startup-") as tmp:
+        site = Path(tmp)
+        for path in BLOG_DIR.glob("*.py"):
+            shutil.copy2(path, site / path.name)
+        shutil.copytree(BLOG_DIR / "static", site / "static")
+        shutil.copytree(BLOG_DIR / "pages", site / "pages")
+        generate_corpus(site / "posts", CorpusSpec(posts=posts))
+
+        command = [sys.executable, "main.py"]
+        env = interpreter_env()
+        subprocess.run(command, cwd=site, env=env, capture_output=True, check=True)
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run(command, cwd=site, env=env, capture_output=True, check=True)
+            best = min(best, time.perf_counter() - start)
+        # Timed separately: -X importtime slows the build down
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "main.py"],
+            cwd=site,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    modules = set(imported_modules(result.stderr))
+    return best * 1000, [name for name in NOOP_HEAVY_MODULES if name in modules]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark build start-up time")
+    parser.add_argument("--repeat", type=int, default=5, help="Best-of repetitions")
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=20.0,
+        help="Fail when `import main` takes longer than this many milliseconds "
+        "beyond the baseline",
+    )
+    parser.add_argument(
+        "--noop-posts",
+        type=int,
+        default=50,
+        help="Posts in the synthetic site of the no-op build (0 skips it)",
+    )
+    parser.add_argument(
+        "--noop-budget",
+        type=float,
+        default=75.0,
+        help="Fail when the no-op build takes longer than this many milliseconds "
+        "beyond the baseline",
+    )
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.ERROR)
+
+    failed = False
+    baseline_ms = measure_baseline(args.repeat)
+    print(f"baseline        {baseline_ms:8.1f} ms  (interpreter + stdlib)")
+    import_ms, loaded = measure_import(args.repeat)
+    status = "ok" if import_ms <= args.budget else "OVER BUDGET"
+    print(
+        f"import main     {import_ms:8.1f} ms  (budget {args.budget:.0f} ms)  {status}"
+    )
+    failed |= import_ms > args.budget
+    if loaded:
+        print(f"heavy modules loaded at import: {', '.join(loaded)}")
+        failed = True
+
+    if args.noop_posts:
+        noop_ms, noop_loaded = measure_noop_build(args.noop_posts, args.repeat)
+        noop_ms -= baseline_ms
+        status = "ok" if noop_ms <= args.noop_budget else "OVER BUDGET"
+        print(
+            f"no-op build     {noop_ms:8.1f} ms  (budget {args.noop_budget:.0f} ms, "
+            f"{args.noop_posts} posts)  {status}"
+        )
+        failed |= noop_ms > args.noop_budget
+        if noop_loaded:
+            print(f"heavy modules loaded by a no-op build: {', '.join(noop_loaded)}")
+            failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Synthetic post corpus generator for the build benchmarks.
+
+Writes *N* post directories shaped like the real ones under `posts/`:
+an `index.md` with optional front matter plus *M* images each.  The same
+seed always produces the same corpus.  Run from the `blog/` directory:
+
+    uv run benchmarks/corpus.py /tmp/corpus --posts 1000 --images 2
+"""
+
+import argparse
+import random
+from dataclasses import dataclass
+from pathlib import Path
+
+from PIL import Image
+
+WORDS = (
+    "graph state node pipeline model agent prompt token python typescript "
+    "build static site render cache image markdown compile async stream "
+    "worker process latency throughput memory index query shard"
+).split()
+
+LANGUAGES = ("python", "typescript", "rust", "bash", "json")
+
+# Front-matter shapes seen (or plausible) in real posts
+FRONT_MATTER_VARIANTS = (
+    "none",
+    "date",
+    "tags-list",
+    "tags-string",
+    "title",
+    "bad-date",
+)
+
+
+@dataclass(frozen=True)
+class CorpusSpec:
+    posts: int = 100
+    paragraphs: int = 20  # body size in paragraphs of ~60 words
+    code_blocks: int = 4
+    code_lines: int = 20
+    mermaid_blocks: int = 1
+    images: int = 1
+    image_size: int = 1600
+    seed: int = 0
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _front_matter(rng: random.Random, index: int) -> str:
+    variant = FRONT_MATTER_VARIANTS[index % len(FRONT_MATTER_VARIANTS)]
+    date = f"{rng.randint(1, 12)}-{rng.randint(1, 28)}-{rng.randint(2015, 2026)}"
+    if variant == "none":
+        return ""
+    if variant == "date":
+        return f"---\ndate: {date}\n---\n"
+    if variant == "tags-list":
+        tags = "".join(f"  - {rng.choice(WORDS)}\n" for _ in range(3))
+        return f"---\ndate: {date}\ntags:\n{tags}---\n"
+    if variant == "tags-string":
+        return (
+            f"---\ndate: {date}\ntags: {rng.choice(WORDS)}, {rng.choice(WORDS)}\n---\n"
+        )
+    if variant == "title":
+        return f"---\ndate: {date}\ntitle: Override {index}\n---\n"
+    return "---\ndate: not-a-date\n---\n"
+
+
+def _code_block(rng: random.Random, lines: int) -> str:
+    lang = rng.choice(LANGUAGES)
+    body = "\n".join(
+        f"{'    ' * (i % 3)}{rng.choice(WORDS)}_{i} = {rng.choice(WORDS)}({i}, \"{rng.choice(WORDS)}\")"
+        for i in range(lines)
+    )
+    return f"```{lang}\n{body}\n```"
+
+
+def _mermaid_block(rng: random.Random) -> str:
+    nodes = [rng.choice(WORDS) for _ in range(6)]
+    edges = "\n".join(f"    {a} --> {b}" for a, b in zip(nodes, nodes[1:]))
+    return f"```mermaid\ngraph TD\n{edges}\n```"
+
+
+def _image(rng: random.Random, size: int) -> Image.Image:
+    """
+    A gradient with noise, so encoders do real work (flat colours are free).
+    """
+    width, height = size, size * 9 // 16
+    noise = Image.effect_noise((width, height), 64).convert("RGB")
+    gradient = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    tint = Image.new(
+        "RGB", (width, height), tuple(rng.randint(0, 255) for _ in range(3))
+    )
+    return Image.blend(Image.blend(noise, gradient, 0.5), tint, 0.3)
+
+
+def generate_post(root: Path, index: int, spec: CorpusSpec, rng: random.Random) -> None:
+    post_dir = root / f"post-{index:05d}"
+    post_dir.mkdir(parents=True, exist_ok=True)
+
+    tag_prefix = "[bench] " if index % 5 == 0 else ""
+    blocks = [f"# {tag_prefix}Synthetic post {index}"]
+    blocks += [_sentence(rng, 60) for _ in range(spec.paragraphs)]
+
+    # Spread code, diagrams and images evenly through the prose
+    extras = [_code_block(rng, spec.code_lines) for _ in range(spec.code_blocks)]
+    extras += [_mermaid_block(rng) for _ in range(spec.mermaid_blocks)]
+    # Images are published flat under posts/images/ and de-duplicated by
+    # name, so each post needs its own names to really add M images
+    for i in range(spec.images):
+        name = f"{post_dir.name}-figure-{i}.png"
+        _image(rng, spec.image_size).save(post_dir / name)
+        extras.append(f"![Figure {i}](./{name})")
+    for extra in extras:
+        blocks.insert(rng.randint(1, len(blocks)), extra)
+
+    text = _front_matter(rng, index) + "\n" + "\n\n".join(blocks) + "\n"
+    (post_dir / "index.md").write_text(text, encoding="utf-8")
+
+
+def generate_corpus(root: Path, spec: CorpusSpec) -> None:
+    """
+    Write the corpus described by *spec* into *root*.
+    """
+    rng = random.Random(spec.seed)
+    for index in range(spec.posts):
+        generate_post(root, index, spec, rng)
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = CorpusSpec()
+    parser.add_argument("--posts", type=int, default=defaults.posts)
+    parser.add_argument("--paragraphs", type=int, default=defaults.paragraphs)
+    parser.add_argument("--code-blocks", type=int, default=defaults.code_blocks)
+    parser.add_argument("--code-lines", type=int, default=defaults.code_lines)
+    parser.add_argument("--mermaid-blocks", type=int, default=defaults.mermaid_blocks)
+    parser.add_argument("--images", type=int, default=defaults.images)
+    parser.add_argument("--image-size", type=int, default=defaults.image_size)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def spec_from_args(args: argparse.Namespace) -> CorpusSpec:
+    return CorpusSpec(
+        posts=args.posts,
+        paragraphs=args.paragraphs,
+        code_blocks=args.code_blocks,
+        code_lines=args.code_lines,
+        mermaid_blocks=args.mermaid_blocks,
+        images=args.images,
+        image_size=args.image_size,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic post corpus")
+    parser.add_argument("output", type=Path, help="Directory to write posts into")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+    generate_corpus(args.output, spec_from_args(args))
+    print(f"Wrote {args.posts} posts to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
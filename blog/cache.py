@@ -0,0 +1,120 @@
+import logging
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+def link_or_copy(src: Path, dst: Path) -> None:
+    """
+    Hardlink *src* to *dst*, falling back to a copy across filesystems.
+
+    An existing *dst* is unlinked first so a previous hardlink is never
+    written through.
+    """
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    dst.unlink(missing_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+@dataclass(frozen=True)
+class DiskCache:
+    """
+    Content-addressed file cache with size-bounded LRU eviction.
+
+    Entries are stored as `root/<key[:2]>/<key>`.  Reads bump the entry's mtime
+    so `evict` can drop the least recently used files first.  Writes go through
+    a temporary file and `os.replace`, so concurrent builds never observe a
+    partial entry.
+    """
+
+    root: Path
+    max_bytes: int
+
+    def path_for(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def get(self, key: str) -> Path | None:
+        """
+        Return the path of the entry for *key*, or None on a miss.
+        """
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, src: Path) -> Path:
+        """
+        Store a copy of *src* under *key* and return the entry path.
+        """
+        return self._store(key, lambda tmp_name: shutil.copyfile(src, tmp_name))
+
+    def get_bytes(self, key: str) -> bytes | None:
+        """
+        Return the contents of the entry for *key*, or None on a miss.
+        """
+        path = self.get(key)
+        if path is None:
+            return None
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:  # evicted by a concurrent build
+            return None
+
+    def put_bytes(self, key: str, data: bytes) -> Path:
+        """
+        Store *data* under *key* and return the entry path.
+        """
+        return self._store(key, lambda tmp_name: Path(tmp_name).write_bytes(data))
+
+    def _store(self, key: str, fill: Callable[[str], object]) -> Path:
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        os.close(fd)
+        try:
+            fill(tmp_name)
+            os.chmod(tmp_name, 0o644)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        return path
+
+    def evict(self) -> None:
+        """
+        Delete least recently used entries until the cache fits in `max_bytes`.
+        """
+        if not self.root.is_dir():
+            return
+
+        entries = []
+        total = 0
+        for path in self.root.glob("*/*"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        entries.sort()
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+
+        if removed:
+            logging.info(f"Evicted {removed} entries from {self.root.name} cache")
@@ -1,52 +1,80 @@
 import asyncio
-import os
+import hashlib
+import html
+import json
+import mimetypes
+import re
 import signal
+import threading
+import traceback
 from pathlib import Path
 
-from aiohttp import web
+from aiohttp import WSMsgType, web
+from assets import (
+    COMPRESSIBLE_SUFFIXES,
+    ENCODING_SUFFIXES,
+    encoders,
+    encoding_names,
+)
 from watchfiles import awatch
 
+# Outputs larger than this are served from disk instead of memory; HTML is
+# always kept in memory, since the file on disk lacks `RELOAD_SCRIPT`
+MAX_INLINE_BYTES = 512 * 1024
+
+# Wait this long after the last change before building
+DEBOUNCE_SECONDS = 0.05
+
+# Give up on a client that takes longer than this to accept an update
+SEND_TIMEOUT_SECONDS = 2.0
+
+CONTENT_RE = re.compile(r"<main id=[\"']?content\b[^>]*>.*</main>", re.DOTALL)
+TITLE_RE = re.compile(r"<title>(.*?)</title>", re.DOTALL)
+ASSET_TAG_RE = re.compile(r"<(?:script|link)\b[^>]*>")
+
 RELOAD_SCRIPT = """
 <script>
   (function () {
-    async function applyUpdate() {
-      try {
-        const res = await fetch(location.href, { cache: "no-store" });
-        const text = await res.text();
-        const doc = new DOMParser().parseFromString(text, "text/html");
-
-        const newContent = doc.querySelector("#content");
-        const oldContent = document.querySelector("#content");
-        if (newContent && oldContent) {
-          // Replace content
-          oldContent.replaceWith(newContent);
-
-          if (window.mermaid && typeof renderMermaid === "function") {
-            try {
-              mermaidInitialized = false;
-              renderMermaid();
-            } catch (e) {
-              console.error("renderMermaid error", e);
-            }
-          }
-        } else {
-          // Fallback to full reload
-          location.reload();
-        }
-
-        const newTitle = doc.querySelector("title");
-        if (newTitle) document.title = newTitle.textContent;
-      } catch (e) {
-        console.error("applyUpdate error", e);
+    function applyContent(message) {
+      const oldContent = document.querySelector("#content");
+      const fragment = document.createElement("template");
+      fragment.innerHTML = message.html;
+      const newContent = fragment.content.querySelector("#content");
+      if (!oldContent || !newContent) {
         location.reload();
+        return;
+      }
+      oldContent.replaceWith(newContent);
+      if (message.title) document.title = message.title;
+
+      if (window.mermaid && typeof renderMermaid === "function") {
+        try {
+          mermaidInitialized = false;
+          renderMermaid();
+        } catch (e) {
+          console.error("renderMermaid error", e);
+        }
       }
     }
 
     try {
       const proto = location.protocol === "https:" ? "wss://" : "ws://";
       const ws = new WebSocket(proto + location.host + "/ws");
-      ws.onmessage = () => {
-        applyUpdate();
+      ws.onopen = () => {
+        // Tell the server which page we show so it only pushes relevant updates
+        ws.send(JSON.stringify({ path: location.pathname }));
+      };
+      ws.onmessage = (event) => {
+        try {
+          const message = JSON.parse(event.data);
+          if (message.type === "content") {
+            applyContent(message);
+            return;
+          }
+        } catch (e) {
+          console.error("live-reload update error", e);
+        }
+        location.reload();
       };
       ws.onclose = () => {
         console.log("reload socket closed");
@@ -60,85 +88,408 @@ RELOAD_SCRIPT = """
 
 
 async def websocket_handler(request):
+    """
+    Track which page each client shows; clients announce it as `{"path": ...}`.
+    """
     ws = web.WebSocketResponse()
     await ws.prepare(request)
-    request.app["sockets"].add(ws)
+    clients = request.app["clients"]
+    clients[ws] = None
     try:
-        async for _ in ws:
-            pass
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            try:
+                clients[ws] = json.loads(msg.data)["path"]
+            except (ValueError, KeyError, TypeError):
+                pass
     finally:
-        request.app["sockets"].discard(ws)
+        clients.pop(ws, None)
     return ws
 
 
-async def file_handler(request):
-    rel_path = request.path
-    if rel_path == "/" or rel_path == "":
-        file_path = os.path.join("./build", "index.html")
-    else:
-        file_path = os.path.join("./build", rel_path.lstrip("/"))
+class Artifact:
+    """
+    A build output ready to serve: HTML already carries `RELOAD_SCRIPT`.
 
-    # If it's a directory, prefer index.html
-    if os.path.isdir(file_path):
-        file_path = os.path.join(file_path, "index.html")
+    HTML and other small files keep their bytes in memory and carry a strong
+    ETag derived from the served bytes; larger ones are streamed from `path`
+    by `web.FileResponse`, which sends its own ETag for the file.
+    `encoded` maps a content encoding to its (body, ETag) pair; HTML bodies
+    are None until `ArtifactStore.encoded_body` compresses them.
+    """
 
-    # Resolve URLs without a .html suffix:
-    if not os.path.exists(file_path):
-        html_path = file_path + ".html"
-        if os.path.exists(html_path):
-            file_path = html_path
-        else:
-            index_path = os.path.join(file_path, "index.html")
-            if os.path.exists(index_path):
-                file_path = index_path
-            else:
-                raise web.HTTPNotFound()
+    __slots__ = ("path", "body", "content_type", "etag", "encoded")
 
-    if file_path.endswith(".html"):
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                text = f.read()
-        except FileNotFoundError:
-            raise web.HTTPNotFound()
+    def __init__(self, path, body, content_type, etag, encoded=None):
+        self.path = path
+        self.body = body
+        self.content_type = content_type
+        self.etag = etag
+        self.encoded = encoded or {}
 
-        if "</body>" in text:
-            text = text.replace("</body>", RELOAD_SCRIPT + "</body>")
-        else:
-            text = text + RELOAD_SCRIPT
 
-        return web.Response(text=text, content_type="text/html")
+def inject_reload_script(text):
+    if "</body>" in text:
+        return text.replace("</body>", RELOAD_SCRIPT + "</body>")
+    return text + RELOAD_SCRIPT
 
-    if not os.path.exists(file_path):
-        raise web.HTTPNotFound()
 
-    return web.FileResponse(path=file_path)
+def make_etag(body, encoding=None):
+    tag = hashlib.sha256(body).hexdigest()[:32]
+    if encoding:
+        tag += "-" + encoding
+    return '"' + tag + '"'
 
 
-async def watch_and_reload(app, ssg_func, watch_paths):
-    print(f"Setting up file watcher for paths: {watch_paths}")
-    async for changes in awatch(*watch_paths):
-        print(f"Changes detected: {changes}")
-        try:
-            ssg_func()
-        except Exception as e:
-            print("Error running ssg():", e)
-            import traceback
+def load_encoded(path, body):
+    """
+    Return the precompressed variants of *body* as {encoding: (bytes, etag)}.
 
-            traceback.print_exc()
+    The build's siblings of HTML lack the reload script, so HTML is left
+    uncompressed here (bytes None) and compressed on first request instead;
+    everything else uses the `.gz`/`.zst` files written by the build.
+    """
+    encoded = {}
+    for encoding in encoding_names():
+        if path.suffix == ".html":
+            data = None
+        else:
+            sibling = path.with_name(path.name + ENCODING_SUFFIXES[encoding])
+            try:
+                data = sibling.read_bytes()
+            except FileNotFoundError:
+                continue
+        encoded[encoding] = (data, make_etag(body, encoding))
+    return encoded
+
+
+def load_artifact(path):
+    content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    if path.suffix == ".html":
+        text = inject_reload_script(path.read_text(encoding="utf-8"))
+        body = text.encode("utf-8")
+    else:
+        body = path.read_bytes()
+    etag = make_etag(body)
+    if len(body) > MAX_INLINE_BYTES and path.suffix != ".html":
+        # FileResponse picks up a `.gz` sibling on its own
+        return Artifact(path, None, content_type, etag)
+    encoded = load_encoded(path, body) if path.suffix in COMPRESSIBLE_SUFFIXES else {}
+    return Artifact(path, body, content_type, etag, encoded)
+
+
+def routes_for(rel_path):
+    """
+    Return every URL that resolves to the output at *rel_path*, mirroring the
+    extensionless and `index.html` fallbacks of a static host.
+    """
+    url = "/" + rel_path
+    routes = [url]
+    if url.endswith("/index.html"):
+        directory = url[: -len("index.html")]
+        routes.append(directory)
+        if directory != "/":
+            routes.append(directory.rstrip("/"))
+    elif url.endswith(".html"):
+        routes.append(url[: -len(".html")])
+    return routes
+
+
+class ArtifactStore:
+    """
+    In-memory copy of the build directory with a precomputed URL routing table.
+
+    `refresh` only re-reads files whose size or mtime changed and swaps the
+    routing table in one assignment, so it is safe to call from a worker
+    thread while requests are being served.  Compressed HTML is memoized by
+    ETag, so a page whose bytes did not change is never compressed twice.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root).resolve()
+        self.routes = {}
+        self._artifacts = {}  # rel path -> (stat key, Artifact)
+        self._compressed = {}  # encoded ETag -> compressed body
+        self._lock = threading.Lock()
+
+    def refresh(self, paths=None):
+        """
+        Re-scan the build directory, or only *paths* when given.
+        """
+        with self._lock:
+            self._refresh(paths)
+
+    def _refresh(self, paths):
+        if paths is None:
+            artifacts = {}
+            paths = sorted(self.root.rglob("*"))
+        else:
+            artifacts = dict(self._artifacts)
+            for path in paths:
+                artifacts.pop(path.relative_to(self.root).as_posix(), None)
+        for path in paths:
+            # Skip in-flight atomic writes; they may vanish at any moment
+            if path.name.startswith(".tmp-"):
+                continue
+            try:
+                if not path.is_file():
+                    continue
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            rel_path = path.relative_to(self.root).as_posix()
+            stat_key = (st.st_size, st.st_mtime_ns)
+            previous = self._artifacts.get(rel_path)
+            if previous and previous[0] == stat_key:
+                artifacts[rel_path] = previous
+            else:
+                try:
+                    artifacts[rel_path] = (stat_key, load_artifact(path))
+                except FileNotFoundError:
+                    continue
+
+        # Exact paths win over the derived extensionless/index routes
+        routes = {}
+        for rel_path, (_, artifact) in artifacts.items():
+            for url in routes_for(rel_path)[1:]:
+                routes.setdefault(url, artifact)
+        for rel_path, (_, artifact) in artifacts.items():
+            routes["/" + rel_path] = artifact
+
+        live = {
+            etag
+            for _, artifact in artifacts.values()
+            for _, etag in artifact.encoded.values()
+        }
+        self._artifacts = artifacts
+        self.routes = routes
+        self._compressed = {
+            etag: data for etag, data in self._compressed.items() if etag in live
+        }
 
-        # Broadcast reload to all connected websockets
-        for ws in list(app["sockets"]):
+    def lookup(self, url_path):
+        return self.routes.get(url_path or "/")
+
+    def encoded_body(self, artifact, encoding):
+        """
+        Return the body of *artifact* in *encoding*, compressing it on first use.
+        """
+        data, etag = artifact.encoded[encoding]
+        if data is None:
+            data = self._compressed.get(etag)
+        if data is None:
+            data = encoders()[encoding](artifact.body)
+            self._compressed[etag] = data
+        return data
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def choose_encoding(accept_encoding, available):
+    """
+    Return the first encoding in *available* (in our order of preference) that
+    the `Accept-Encoding` header allows, or None for the identity body.
+    """
+    if not accept_encoding or not available:
+        return None
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
             try:
-                await ws.send_str("reload")
-            except Exception:
-                app["sockets"].discard(ws)
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in available:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
 
 
-async def on_startup(app):
-    app["sockets"] = set()
+async def file_handler(request):
+    store = request.app["store"]
+    lazy = request.app["lazy"]
+    if lazy is not None and lazy.pending(request.path):
+        written = await asyncio.to_thread(lazy.ensure, request.path)
+        await asyncio.to_thread(store.refresh, written)
+
+    artifact = store.lookup(request.path)
+    if artifact is None:
+        raise web.HTTPNotFound()
+
+    encoding = choose_encoding(request.headers.get("Accept-Encoding"), artifact.encoded)
+    if encoding is None:
+        body, etag = artifact.body, artifact.etag
+    else:
+        body, etag = artifact.encoded[encoding]
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if artifact.encoded:
+        headers["Vary"] = "Accept-Encoding"
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        return web.Response(status=304, headers=headers)
+
+    if body is None:
+        if encoding is None:
+            return web.FileResponse(path=artifact.path, headers=headers)
+        body = await asyncio.to_thread(store.encoded_body, artifact, encoding)
+
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    charset = "utf-8" if artifact.content_type.startswith("text/") else None
+    return web.Response(
+        body=body,
+        content_type=artifact.content_type,
+        charset=charset,
+        headers=headers,
+    )
+
+
+def update_message(old, new):
+    """
+    Return the message that brings a client from artifact *old* to *new*, or
+    None if the page did not change.
+
+    The `#content` fragment is pushed when only it can have changed; pages
+    that gained or lost scripts/styles (or are streamed from disk) reload.
+    """
+    if new is old or (old is not None and new is not None and new.etag == old.etag):
+        return None
+    if old is None or new is None or old.body is None or new.body is None:
+        return {"type": "reload"}
+
+    old_text = old.body.decode("utf-8", "replace")
+    new_text = new.body.decode("utf-8", "replace")
+    content = CONTENT_RE.search(new_text)
+    if content is None or ASSET_TAG_RE.findall(
+        CONTENT_RE.sub("", old_text)
+    ) != ASSET_TAG_RE.findall(CONTENT_RE.sub("", new_text)):
+        return {"type": "reload"}
+
+    title = TITLE_RE.search(new_text)
+    return {
+        "type": "content",
+        "html": content.group(0),
+        "title": html.unescape(title.group(1)) if title else None,
+    }
+
+
+class LiveReloader:
+    """
+    Rebuilds the site on file changes and pushes updates to open pages.
+
+    Changes are collected into one pending set; a burst of saves becomes a
+    single build once `DEBOUNCE_SECONDS` pass without new events.  Changes
+    arriving mid-build cancel the running build (see `ssg`'s *cancel*), whose
+    paths are folded into the next one.  After a build only clients whose
+    page changed get a message, all sent concurrently.
+    """
+
+    def __init__(self, app, ssg_func, rebuild_func=None):
+        self.app = app
+        self.ssg_func = ssg_func
+        self.rebuild_func = rebuild_func
+        self.pending = set()
+        self.wake = asyncio.Event()
+        self.cancel = None  # threading.Event of the running build
+
+    async def watch(self, watch_paths):
+        print(f"Setting up file watcher for paths: {watch_paths}")
+        async for changes in awatch(*watch_paths):
+            print(f"Changes detected: {changes}")
+            self.pending.update(Path(path) for _, path in changes)
+            if self.cancel is not None:
+                self.cancel.set()
+            self.wake.set()
+
+    async def run(self):
+        while True:
+            await self.wake.wait()
+            while True:
+                self.wake.clear()
+                try:
+                    await asyncio.wait_for(self.wake.wait(), DEBOUNCE_SECONDS)
+                except asyncio.TimeoutError:
+                    break
+
+            changed, self.pending = self.pending, set()
+            self.cancel = cancel = threading.Event()
+            try:
+                # Build off the event loop so requests keep being served meanwhile
+                await asyncio.to_thread(self.build, changed, cancel)
+            except Exception as e:
+                if not cancel.is_set():
+                    print("Error running ssg():", e)
+                    traceback.print_exc()
+            finally:
+                self.cancel = None
+
+            if cancel.is_set():
+                print("Build superseded by newer changes")
+                self.pending |= changed
+                continue
+
+            await self.publish()
+
+    def build(self, changed, cancel):
+        if self.rebuild_func is not None:
+            self.rebuild_func(changed, cancel)
+        else:
+            self.ssg_func(cancel=cancel)
+
+    async def publish(self):
+        store = self.app["store"]
+        clients = self.app["clients"]
+        before = {ws: store.lookup(path) for ws, path in clients.items() if path}
+        await asyncio.to_thread(store.refresh)
+
+        messages = {}  # (old, new) etags -> message, shared by clients on a page
+        sends = []
+        for ws, old in before.items():
+            if ws not in clients:  # disconnected during the build
+                continue
+            new = store.lookup(clients[ws])
+            key = (old and old.etag, new and new.etag)
+            if key not in messages:
+                messages[key] = update_message(old, new)
+            if messages[key] is not None:
+                sends.append(self.send(ws, messages[key]))
+        await asyncio.gather(*sends)
+
+    async def send(self, ws, message):
+        try:
+            await asyncio.wait_for(ws.send_json(message), SEND_TIMEOUT_SECONDS)
+        except Exception:
+            self.app["clients"].pop(ws, None)
+            await ws.close()
 
 
-async def run_dev(ssg_func, host="127.0.0.1", port=8000, watch_paths=None):
+async def on_startup(app):
+    app["clients"] = {}  # websocket -> path of the page it shows
+    await asyncio.to_thread(app["store"].refresh)
+
+
+async def run_dev(
+    ssg_func,
+    host="127.0.0.1",
+    port=8000,
+    watch_paths=None,
+    rebuild_func=None,
+    lazy=None,
+):
+    """
+    Serve `build/` with live reload.  With *lazy* (a `main.LazySite`), pages are
+    produced on first request instead of by an up-front build.
+    """
     if watch_paths is None:
         watch_paths = ["static", "pages", "posts"]
 
@@ -146,6 +497,8 @@ async def run_dev(ssg_func, host="127.0.0.1", port=8000, watch_paths=None):
     watch_paths = [Path(p) if isinstance(p, str) else p for p in watch_paths]
 
     app = web.Application()
+    app["store"] = ArtifactStore(Path("build"))
+    app["lazy"] = lazy
     app.on_startup.append(on_startup)
     app.router.add_get("/ws", websocket_handler)
     app.router.add_get("/{tail:.*}", file_handler)
@@ -154,7 +507,11 @@ async def run_dev(ssg_func, host="127.0.0.1", port=8000, watch_paths=None):
     await runner.setup()
     site = web.TCPSite(runner, host, port)
 
-    watcher_task = asyncio.create_task(watch_and_reload(app, ssg_func, watch_paths))
+    reloader = LiveReloader(app, ssg_func, rebuild_func)
+    watcher_tasks = [
+        asyncio.create_task(reloader.watch(watch_paths)),
+        asyncio.create_task(reloader.run()),
+    ]
 
     await site.start()
     print(f"Dev server serving ./blog at http://{host}:{port}")
@@ -178,13 +535,15 @@ async def run_dev(ssg_func, host="127.0.0.1", port=8000, watch_paths=None):
         print("Shutdown signal received, stopping dev server...")
     finally:
         # Cancel watcher and close websockets
-        watcher_task.cancel()
-        try:
-            await watcher_task
-        except asyncio.CancelledError:
-            pass
+        for task in watcher_tasks:
+            task.cancel()
+        for task in watcher_tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
 
-        for ws in list(app.get("sockets", [])):
+        for ws in list(app.get("clients", {})):
             try:
                 await ws.close()
             except Exception:
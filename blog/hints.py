@@ -0,0 +1,116 @@
+import json
+import re
+from typing import Dict, Iterable, List, Sequence
+
+from assets import CLIENT_FEATURES
+
+# Listing and static pages prefetch this many of the newest posts they link to
+NEWEST_POSTS = 3
+
+# Stylesheets every page renders with; feature stylesheets are added per page
+CRITICAL_STYLESHEETS = ("/styles.css",)
+
+STYLESHEET_RE = re.compile(r"""<link rel="stylesheet" href="([^"]+)\"""")
+IMG_RE = re.compile(r"<img\b[^>]*>", re.IGNORECASE)
+# Values may be unquoted: `minify_html` drops the quotes where it can
+IMG_ATTR_RE = re.compile(
+    r"""\b(src|srcset|sizes)=(?:(["'])(.*?)\2|([^\s"'=<>`]+))""", re.IGNORECASE
+)
+
+# Same-origin links are prefetched once the pointer rests on them, replacing
+# the hover heuristic of static/prefetch-nav.js where speculation rules work
+DOCUMENT_RULE = {
+    "source": "document",
+    "where": {"href_matches": "/*"},
+    "eagerness": "moderate",
+}
+
+
+def post_url(post_code: str) -> str:
+    return f"/posts/{post_code}"
+
+
+def adjacent_posts(post_codes: Sequence[str]) -> Dict[str, List[str]]:
+    """
+    Map each post in *post_codes* (listing order, newest first) to the URLs
+    of the posts next to it: the newer one, then the older one.
+    """
+    neighbours = {}
+    for i, post_code in enumerate(post_codes):
+        adjacent = post_codes[max(i - 1, 0) : i] + post_codes[i + 1 : i + 2]
+        neighbours[post_code] = [post_url(code) for code in adjacent]
+    return neighbours
+
+
+def critical_stylesheets(features: List[str], asset_urls: Dict[str, str]) -> List[str]:
+    """
+    Return the (fingerprinted) URLs of the stylesheets a page with *features*
+    needs before it can paint.
+    """
+    urls = list(CRITICAL_STYLESHEETS)
+    for feature in CLIENT_FEATURES:
+        if feature.name in features:
+            for tag in feature.head:
+                urls.extend(STYLESHEET_RE.findall(tag))
+    return [asset_urls.get(url, url) for url in urls]
+
+
+def first_image_preload(content: str) -> str:
+    """
+    Return a `<link rel="preload">` for the first `<img>` in *content*, with
+    its `srcset`/`sizes` so the browser picks the same variant; "" if there is
+    no image worth preloading.
+    """
+    match = IMG_RE.search(content)
+    if not match:
+        return ""
+    attrs = {
+        name.lower(): quoted or unquoted
+        for name, _, quoted, unquoted in IMG_ATTR_RE.findall(match.group(0))
+    }
+    src = attrs.get("src", "")
+    if not src or src.startswith("data:"):
+        return ""
+    tag = f'<link rel="preload" href="{src}" as="image"'
+    if "srcset" in attrs:
+        tag += f' imagesrcset="{attrs["srcset"]}"'
+        if "sizes" in attrs:
+            tag += f' imagesizes="{attrs["sizes"]}"'
+    return tag + " />"
+
+
+def speculation_rules(urls: List[str]) -> str:
+    """
+    Return a `<script type="speculationrules">` that prefetches *urls* right
+    away and prerenders them once a link to one is hovered.
+    """
+    rules = {"prefetch": [DOCUMENT_RULE]}
+    if urls:
+        rules["prefetch"].insert(0, {"source": "list", "urls": urls})
+        rules["prerender"] = [{"source": "list", "urls": urls, "eagerness": "moderate"}]
+    data = json.dumps(rules, separators=(",", ":")).replace("</", "<\\/")
+    return f'<script type="speculationrules">{data}</script>'
+
+
+def hint_slots(
+    content: str | Iterable[str],
+    features: List[str],
+    asset_urls: Dict[str, str],
+    next_urls: List[str],
+) -> Dict[str, str]:
+    """
+    Return the `nav_hints` template value of a page: preloads for its critical
+    stylesheets and first content image, and speculation rules for
+    *next_urls*, the pages a reader most likely opens next.
+    """
+    if not isinstance(content, str):
+        content = "".join(content)
+    tags = [
+        f'<link rel="preload" href="{url}" as="style" />'
+        for url in critical_stylesheets(features, asset_urls)
+    ]
+    image = first_image_preload(content)
+    if image:
+        tags.append(image)
+    tags.append(speculation_rules(next_urls))
+    return {"nav_hints": "\n    ".join(tags)}
@@ -1,51 +1,192 @@
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Sequence, Tuple
+import json
 import logging
 
-from PIL import Image
+from cache import DiskCache, link_or_copy
+from manifest import hash_bytes
 
 logger = logging.getLogger(__name__)
 
 
-def check_image_valid(image_path: Path) -> bool:
+# Extensions worth sniffing; anything else (index.md, ...) is never opened.
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp", ".tif", ".tiff"}
+
+# (offset, magic bytes) pairs identifying the formats above
+IMAGE_SIGNATURES = (
+    (0, b"\x89PNG\r\n\x1a\n"),
+    (0, b"\xff\xd8\xff"),
+    (0, b"GIF87a"),
+    (0, b"GIF89a"),
+    (8, b"WEBP"),
+    (0, b"BM"),
+    (0, b"II*\x00"),
+    (0, b"MM\x00*"),
+)
+
+# Bump when `probe_image` changes what it records.
+PROBE_VERSION = "1"
+
+
+def sniff_image(image_path: Path) -> bool:
     """
-    Return True if the file at `image_path` is a valid image.
+    Return True if the first bytes of `image_path` look like a supported image.
+
+    This rejects text files with an image extension (such as Git LFS pointers)
+    without handing them to Pillow.
     """
     try:
-        with Image.open(image_path) as img:
-            img.verify()
-        return True
-    except Exception:
+        with open(image_path, "rb") as fh:
+            head = fh.read(16)
+    except OSError:
         return False
+    return any(head[offset:].startswith(magic) for offset, magic in IMAGE_SIGNATURES)
+
+
+def probe_cache_key(image_path: Path, size: int, mtime_ns: int) -> str:
+    """
+    Return the cache key for the probe of `image_path` at this size and mtime.
+    """
+    return hash_bytes(
+        f"probe:{PROBE_VERSION}".encode("ascii"),
+        str(image_path.resolve()).encode("utf-8"),
+        f"{size}:{mtime_ns}".encode("ascii"),
+    )
+
+
+def probe_image(
+    image_path: Path, cache: DiskCache | None = None
+) -> Tuple[int, int] | None:
+    """
+    Return the (width, height) of `image_path`, or None if it is not a valid image.
+
+    The result is memoized in `cache` under the file's path, size and mtime,
+    so an untouched image is never opened again.  On a miss the header is
+    sniffed first and only plausible images are verified by Pillow.
+    """
+    key = None
+    if cache is not None:
+        st = image_path.stat()
+        key = probe_cache_key(image_path, st.st_size, st.st_mtime_ns)
+        cached = cache.get_bytes(key)
+        if cached is not None:
+            size = json.loads(cached)
+            return tuple(size) if size else None
+
+    size = None
+    if sniff_image(image_path):
+        from PIL import Image
+
+        try:
+            with Image.open(image_path) as img:
+                size = img.size
+                img.verify()
+        except Exception:
+            size = None
+
+    if key is not None:
+        cache.put_bytes(key, json.dumps(size).encode("ascii"))
+    return size
+
 
+def discover_images(
+    base_path: Path, cache: DiskCache | None = None
+) -> Dict[str, Tuple[int, int]]:
+    """
+    Return the valid images in `base_path` as a sorted {filename: (width, height)}.
+    """
+    if not base_path.is_dir():
+        return {}
+
+    images = {}
+    for path in sorted(base_path.iterdir()):
+        if path.suffix.lower() not in IMAGE_SUFFIXES or not path.is_file():
+            continue
+        size = probe_image(path, cache)
+        if size:
+            images[path.name] = size
+    return images
+
+
+def plan_variants(
+    size: Tuple[int, int], widths: Sequence[int]
+) -> List[Tuple[int, int]]:
+    """
+    Return the (width, height) of each responsive variant for an image of `size`.
 
-def filter_invalid_images(base_path: Path) -> List[str]:
+    Widths larger than the image are clamped to its own width (never upscaled)
+    and duplicates collapse, so small images yield a single variant.
     """
-    Return a list of valid image filenames found in `base_path`.
-    Non-files and invalid images are filtered out.
+    width, height = size
+    planned = sorted({min(w, width) for w in widths})
+    return [(w, max(1, round(height * w / width))) for w in planned]
+
+
+def variant_name(name: str, width: int) -> str:
+    """
+    Return the output filename of the `width` variant of image `name`.
+
+    The source extension is kept in the stem so `a.png` and `a.jpg` never clash.
     """
-    if not base_path.exists() or not base_path.is_dir():
-        return []
+    path = Path(name)
+    return f"{path.stem}-{path.suffix.lstrip('.').lower()}-{width}.webp"
 
-    potential = [p for p in base_path.iterdir() if p.is_file()]
-    valid = [p.name for p in potential if check_image_valid(p)]
-    return valid
 
+# Bump when the encoding pipeline changes so stale cache entries are ignored.
+ENCODER_VERSION = "2"
 
-def compress_image(
-    src: Path, dst: Path, quality: int = 85, max_size: int = 720
+
+def image_cache_key(src_bytes: bytes, quality: int, width: int) -> str:
+    """
+    Return the cache key for encoding *src_bytes* at `width` with `quality`.
+    """
+    params = f"webp:{ENCODER_VERSION}:q{quality}:w{width}"
+    return hash_bytes(params.encode("ascii"), src_bytes)
+
+
+def compress_variants(
+    src: Path,
+    dst_dir: Path,
+    widths: Sequence[int],
+    quality: int = 85,
+    cache: DiskCache | None = None,
 ) -> bool:
     """
-    Compress `src` image and write it to `dst` as WEBP.
-    Returns True on success, False on failure.
+    Write every responsive variant of `src` to `dst_dir` as WEBP.
+
+    The source is decoded at most once, and only if some variant is missing
+    from `cache`.  Returns True on success, False on failure.
     """
+    from PIL import Image
+
     try:
-        dst.parent.mkdir(parents=True, exist_ok=True)
+        dst_dir.mkdir(parents=True, exist_ok=True)
+        src_bytes = src.read_bytes() if cache is not None else b""
         with Image.open(src) as img:
-            rgb_im = img.convert("RGB")
-            rgb_im.thumbnail((max_size, max_size))
-            rgb_im.save(dst, "WEBP", quality=quality)
+            variants = plan_variants(img.size, widths)
+            rgb_im = None
+            for width, height in variants:
+                dst = dst_dir / variant_name(src.name, width)
+                key = None
+                if cache is not None:
+                    key = image_cache_key(src_bytes, quality, width)
+                    cached = cache.get(key)
+                    if cached is not None:
+                        link_or_copy(cached, dst)
+                        continue
+
+                if rgb_im is None:
+                    rgb_im = img.convert("RGB")
+                variant = rgb_im
+                if width < rgb_im.width:
+                    variant = rgb_im.resize((width, height), Image.Resampling.LANCZOS)
+
+                # `dst` may be a hardlink into the cache; never write through it.
+                dst.unlink(missing_ok=True)
+                variant.save(dst, "WEBP", quality=quality)
+                if key is not None:
+                    cache.put(key, dst)
         return True
     except Exception as e:
-        logger.warning("Error compressing image %s -> %s: %s", src, dst, e)
+        logger.warning("Error compressing image %s -> %s: %s", src, dst_dir, e)
         return False
@@ -1,17 +1,54 @@
+import functools
 import html
+import json
 import logging
 import os
 import re
-import shutil
-from dataclasses import dataclass
+import threading
+from collections import deque
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Iterable, List, Set, Tuple
-
-import markdown2
-import yaml
-from images import compress_image, filter_invalid_images
-from render import add_line_numbers
+from typing import (
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+import profiling
+from assets import (
+    FINGERPRINT_SUFFIXES,
+    detect_features,
+    feature_slots,
+    fingerprint_assets,
+    precompress_outputs,
+    rewrite_asset_refs,
+    write_asset_manifest,
+)
+from cache import DiskCache
+from images import (
+    IMAGE_SUFFIXES,
+    compress_variants,
+    discover_images,
+    plan_variants,
+    variant_name,
+)
+from manifest import MANIFEST_NAME, BuildManifest, hash_bytes, post_inputs_hash
+from metadata import (
+    METADATA_INDEX_NAME,
+    MetadataIndex,
+    PostRecord,
+    load_yaml,
+    read_header_text,
+)
+from output import OutputWriter
+from render import Template, add_line_numbers, rewrite_images
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -25,6 +62,15 @@ class Config:
     output_dir: Path = base_dir / "build"
     template_path: Path = base_dir / "static" / "template.html"
     static_dir: Path = base_dir / "static"
+    cache_dir: Path = base_dir / ".cache"
+    image_cache_max_bytes: int = 1024 * 1024 * 1024
+    markdown_cache_max_bytes: int = 256 * 1024 * 1024
+    highlight_cache_max_bytes: int = 128 * 1024 * 1024
+    probe_cache_max_bytes: int = 16 * 1024 * 1024
+    image_widths: Tuple[int, ...] = (360, 720, 1440)
+    image_default_width: int = 720
+    image_sizes: str = "(max-width: 800px) 100vw, 800px"
+    posts_per_page: int = 10
 
 
 @dataclass(frozen=True)
@@ -34,6 +80,28 @@ class Page:
     display_name: str  # e.g. 'About'
 
 
+@dataclass(slots=True)
+class PostMeta:
+    """
+    What listings and the build manifest need to know about a post; unlike
+    `Post` it does not hold the rendered HTML, so the whole archive fits in
+    memory even when the rendered site does not.
+    """
+
+    code: str
+    title: str
+    date: datetime
+    tags: List[str]
+    excerpt: str
+    link_path: Path  # relative path used in links
+    # image name → [(width, height), ...] of the variants this post links to
+    images: Dict[str, List[Tuple[int, int]]] = field(default_factory=dict)
+    # client features (see `assets.CLIENT_FEATURES`) the rendered post needs
+    features: List[str] = field(default_factory=list)
+    # bytes `minify_html` removed from the post's content (0 when not minified)
+    minify_saved: int = 0
+
+
 @dataclass
 class Post:
     code: str
@@ -43,13 +111,34 @@ class Post:
     excerpt: str
     content_html: str
     link_path: Path  # relative path used in links
+    # image name → [(width, height), ...] of the variants this post links to
+    images: Dict[str, List[Tuple[int, int]]] = field(default_factory=dict)
+    # client features (see `assets.CLIENT_FEATURES`) the rendered post needs
+    features: List[str] = field(default_factory=list)
+    # bytes `minify_html` removed from content_html (0 when not minified)
+    minify_saved: int = 0
+    # search term → weight (see `search.post_terms`)
+    terms: Dict[str, int] = field(default_factory=dict)
+
+    def meta(self) -> PostMeta:
+        return PostMeta(
+            code=self.code,
+            title=self.title,
+            date=self.date,
+            tags=self.tags,
+            excerpt=self.excerpt,
+            link_path=self.link_path,
+            images=self.images,
+            features=self.features,
+            minify_saved=self.minify_saved,
+        )
 
 
-def load_template(template_path: Path) -> str:
+def load_template(template_path: Path) -> Template:
     """
-    Read the template file.
+    Read and compile the template file.
     """
-    return template_path.read_text(encoding="utf-8")
+    return Template.compile(template_path.read_text(encoding="utf-8"))
 
 
 def discover_pages(pages_dir: Path) -> List[Page]:
@@ -98,7 +187,7 @@ def extract_front_matter(md_text: str) -> Tuple[Dict, str]:
         parts = md_text.split("---", 2)
         front_matter_yaml = parts[1]
         body = parts[2] if len(parts) > 2 else ""
-        metadata = yaml.safe_load(front_matter_yaml) or {}
+        metadata = load_yaml(front_matter_yaml) or {}
         return metadata, body
 
     return {}, md_text
@@ -133,21 +222,38 @@ def extract_tags_from_title(title: str) -> Tuple[List[str], str]:
     return tags, title
 
 
-def extract_excerpt(body: str) -> str:
+def tag_key(tag: str) -> str:
     """
-    Grab the first paragraph (or first block of text separated by double newlines),
-    convert it to Markdown → HTML → plain text and truncate to 150 chars.
+    Return what identifies *tag*: spellings that only differ in case or
+    whitespace, such as 'Machine Learning' and 'machine-learning', are one tag.
     """
-    paragraphs = [p for p in body.split("\n\n") if p.strip()]
-    if not paragraphs:
-        return ""
+    return re.sub(r"\s+", "-", tag.strip().lower())
 
-    first_para = paragraphs[0]
-    html_frag = markdown2.markdown(
-        first_para,
-        extras=["fenced-code-blocks", "header-ids"],
-    )
-    text = re.sub(r"<[^>]+>", "", html_frag).strip().replace("\n", " ")
+
+def tag_slug(tag: str) -> str:
+    """
+    Return the URL-safe name of *tag*, e.g. 'Machine Learning' → 'machine-learning'.
+
+    When that would drop characters ('C++', 'C#', non-ASCII tags), a hash of
+    `tag_key` follows a double hyphen, e.g. 'C++' → 'c--4d3d1825f5'.  Plain
+    slugs never contain a double hyphen, so different tags never share a slug
+    short of a hash collision (which `build_tag_index` reports).
+    """
+    key = tag_key(tag)
+    readable = re.sub(r"[^a-z0-9]+", "-", key).strip("-")
+    if readable and readable == key:
+        return readable
+    return f"{readable or 'tag'}--{hash_bytes(key.encode('utf-8'))[:10]}"
+
+
+def extract_excerpt(html_content: str) -> str:
+    """
+    Grab the first block of the rendered *html_content* (blocks are separated
+    by blank lines), strip it to plain text and truncate to 150 chars.
+    """
+    blocks = (b for b in html_content.split("\n\n") if b.strip())
+    first_block = next(blocks, "")
+    text = re.sub(r"<[^>]+>", "", first_block).strip().replace("\n", " ")
 
     if len(text) > 150:
         return text[:147].rstrip() + "..."
@@ -155,31 +261,119 @@ def extract_excerpt(body: str) -> str:
     return text
 
 
-def convert_markdown(md: str) -> str:
+MARKDOWN_EXTRAS = ["fenced-code-blocks", "header-ids", "mermaid", "codehilite"]
+
+
+def highlight_cache_key(codeblock: str, lexer, formatter_opts: Dict) -> str:
     """
-    Render Markdown to HTML with the required extras.
+    Key a highlighted block by lexer (class and options), code text, formatter
+    options and Pygments version.
     """
-    return markdown2.markdown(
-        md,
-        extras=["fenced-code-blocks", "header-ids", "mermaid", "codehilite"],
+    import pygments
+
+    lexer_id = f"{type(lexer).__module__}.{type(lexer).__qualname__}"
+    params = (
+        f"{pygments.__version__}:{lexer_id}:{sorted(lexer.options.items())}:"
+        f"{sorted(formatter_opts.items())}"
     )
+    return hash_bytes(params.encode("utf-8"), codeblock.encode("utf-8"))
 
 
-def process_post(
-    post_code: str, post_dir: Path, output_images_dir: Path, img_set: Set[str]
-) -> Post | None:
+@functools.cache
+def blog_markdown_class() -> type:
     """
-    Read a single post, parse its content and return a `Post` object.
+    Return markdown2's `Markdown` with a hook around Pygments highlighting of
+    code blocks.
+
+    markdown2 is imported here, on first conversion, rather than at startup:
+    commands that never render markdown (no-op builds, the lazy dev server)
+    do not pay for it.  When `highlight_cache` is set, highlighted blocks are
+    looked up by `highlight_cache_key` before running Pygments, so identical
+    snippets are only highlighted once across posts and builds.
+    """
+    import markdown2
+
+    class BlogMarkdown(markdown2.Markdown):
+        highlight_cache: DiskCache | None = None
+
+        def _color_with_pygments(self, codeblock, lexer, **formatter_opts):
+            key = None
+            if self.highlight_cache is not None:
+                key = highlight_cache_key(codeblock, lexer, formatter_opts)
+                cached = self.highlight_cache.get_bytes(key)
+                if cached is not None:
+                    profiling.count("highlight_cache_hits")
+                    return cached.decode("utf-8")
+
+            with profiling.stage("highlight"):
+                colored = super()._color_with_pygments(
+                    codeblock, lexer, **formatter_opts
+                )
+            if key is not None:
+                self.highlight_cache.put_bytes(key, colored.encode("utf-8"))
+            return colored
+
+    return BlogMarkdown
+
+
+# Lines that may open a code block, the only thing Pygments touches; fences
+# can be indented inside list items and block quotes
+CODE_BLOCK_RE = re.compile(r"^[ \t>]*(?:```|~~~)|^(?:\t| {4})", re.MULTILINE)
 
-    *post_dir* must contain an `index.md`.  Images are copied/compressed to
-    *output_images_dir*.  Duplicate images across posts are skipped.
+
+def markdown_cache_key(md: str) -> str:
     """
-    index_md = post_dir / "index.md"
-    if not index_md.is_file():
-        logging.warning(f"Missing index.md in {post_dir}")
-        return None
+    Key a rendering of *md* by its text, the extras and the renderer versions.
+
+    The Pygments version only counts (and Pygments is only imported) when
+    *md* may contain a code block.
+    """
+    import markdown2
+
+    versions = f"{markdown2.__version__}:{MARKDOWN_EXTRAS}"
+    if CODE_BLOCK_RE.search(md):
+        import pygments
+
+        versions += f":{pygments.__version__}"
+    return hash_bytes(versions.encode("utf-8"), md.encode("utf-8"))
 
-    md_text = index_md.read_text(encoding="utf-8")
+
+def convert_markdown(
+    md: str,
+    cache: DiskCache | None = None,
+    highlight_cache: DiskCache | None = None,
+) -> str:
+    """
+    Render Markdown to HTML with the required extras.
+
+    With a *cache*, a previous rendering of the same text is reused; with a
+    *highlight_cache*, so are previously highlighted code blocks.
+    """
+    key = None
+    if cache is not None:
+        key = markdown_cache_key(md)
+        cached = cache.get_bytes(key)
+        if cached is not None:
+            profiling.count("markdown_cache_hits")
+            return cached.decode("utf-8")
+
+    markdowner = blog_markdown_class()(extras=MARKDOWN_EXTRAS)
+    markdowner.highlight_cache = highlight_cache
+    html_content = str(markdowner.convert(md))
+    if key is not None:
+        cache.put_bytes(key, html_content.encode("utf-8"))
+    return html_content
+
+
+def parse_post_header(
+    post_code: str, md_text: str
+) -> Tuple[str, datetime, List[str], str]:
+    """
+    Return the title, date, tags and markdown body of a post's source.
+
+    Only the front matter and the first heading are read, so this is cheap
+    enough to run over every post without converting any markdown.
+    """
     metadata, body = extract_front_matter(md_text)
 
     raw_title = extract_title(body)
@@ -209,37 +403,100 @@ def process_post(
     # Front-matter can override the title
     title = metadata.get("title", title)
     body = re.sub(r"(?m)^#\s*(?:$[^$]+$\s*)*(.*)$", r"# \1", body, count=1)
+    return title, date_obj, tags, body
+
 
-    excerpt_text = extract_excerpt(body)
+def read_post_header(post_code: str, index_md: Path) -> Tuple[str, datetime, List[str]]:
+    """
+    Return the title, date and tags of a post, reading only as much of
+    *index_md* as `parse_post_header` needs (see `metadata.read_header_text`).
+    """
+    title, date_obj, tags, _ = parse_post_header(post_code, read_header_text(index_md))
+    return title, date_obj, tags
+
+
+def parse_post(
+    post_code: str,
+    post_dir: Path,
+    markdown_cache: DiskCache | None = None,
+    highlight_cache: DiskCache | None = None,
+    probe_cache: DiskCache | None = None,
+    minify: bool = False,
+) -> Post | None:
+    """
+    Read a single post, parse its content and return a `Post` object.
+
+    *post_dir* must contain an `index.md`.  The returned post lists the
+    responsive variants of every valid image in *post_dir*; nothing is written
+    to disk.  Images are validated through *probe_cache* and not decoded.
+    With *minify*, the rendered content is passed through `minify_html`.
+    """
+    config = Config()
+    index_md = post_dir / "index.md"
+    if not index_md.is_file():
+        logging.warning(f"Missing index.md in {post_dir}")
+        return None
+
+    with profiling.stage("read", post_code):
+        md_text = index_md.read_text(encoding="utf-8")
+    profiling.count("bytes_read", len(md_text.encode("utf-8")))
+
+    with profiling.stage("front_matter", post_code):
+        title, date_obj, tags, body = parse_post_header(post_code, md_text)
 
     # Markdown + Code helpers
-    html_content = convert_markdown(body)
-    html_content = add_line_numbers(html_content)
+    with profiling.stage("markdown", post_code):
+        html_content = convert_markdown(body, markdown_cache, highlight_cache)
+    with profiling.stage("excerpt", post_code):
+        excerpt_text = extract_excerpt(html_content)
+    with profiling.stage("search_terms", post_code):
+        from search import post_terms
+
+        terms = post_terms(title, tags, html_content)
+    with profiling.stage("line_numbers", post_code):
+        html_content = add_line_numbers(html_content)
 
     # Tag write
-    if tags:
-        tag_html = (
-            '<div class="post-meta"><div class="tags">'
-            + "".join(f'<span class="tag">{t}</span>' for t in tags)
-            + "</div></div>"
-        )
-        if "</h1>" in html_content:
-            html_content = html_content.replace("</h1>", f"</h1>{tag_html}", 1)
-        else:
-            html_content = tag_html + html_content
-    # Fix image paths
-    html_content = html_content.replace('<img src="', '<img src="/posts/images/')
+    with profiling.stage("tags", post_code):
+        if tags:
+            tag_html = (
+                '<div class="post-meta"><div class="tags">'
+                + "".join(
+                    f'<a class="tag" href="/tags/{tag_slug(t)}">{t}</a>' for t in tags
+                )
+                + "</div></div>"
+            )
+            if "</h1>" in html_content:
+                html_content = html_content.replace("</h1>", f"</h1>{tag_html}", 1)
+            else:
+                html_content = tag_html + html_content
+
+    with profiling.stage("images", post_code):
+        images = {
+            img_name: plan_variants(size, config.image_widths)
+            for img_name, size in discover_images(post_dir, probe_cache).items()
+        }
 
-    for img_name in filter_invalid_images(post_dir):
-        if img_name in img_set:
-            continue
-        src_path = post_dir / img_name
-        dst_path = output_images_dir / img_name
-        dst_path.parent.mkdir(parents=True, exist_ok=True)
-        compress_image(src_path, dst_path, quality=85)
-        img_set.add(img_name)
+        # Fix image paths
+        html_content = rewrite_images(
+            html_content,
+            images,
+            base_url="/posts/images/",
+            sizes=config.image_sizes,
+            default_width=config.image_default_width,
+        )
 
     link_path = Path("posts") / f"{post_code}.html"
+    features = detect_features(html_content)
+
+    minify_saved = 0
+    if minify:
+        from minify import bytes_saved, minify_html
+
+        with profiling.stage("minify", post_code):
+            minified = minify_html(html_content)
+            minify_saved = bytes_saved(html_content, minified)
+            html_content = minified
 
     return Post(
         code=post_code,
@@ -249,32 +506,197 @@ def process_post(
         excerpt=excerpt_text,
         content_html=html_content,
         link_path=link_path,
+        images=images,
+        features=features,
+        minify_saved=minify_saved,
+        terms=terms,
+    )
+
+
+def claim_images(post: Post, img_set: Set[str]) -> List[str]:
+    """
+    Return the images of *post* not already claimed by an earlier post, which
+    it publishes.
+
+    Posts must be claimed in directory order so duplicates resolve the same way
+    regardless of how the posts were parsed.  `post.images` keeps every image
+    the post links to, so the variants of a shared name stay live as long as
+    any post uses them.
+    """
+    claimed = [name for name in post.images if name not in img_set]
+    img_set.update(claimed)
+    return claimed
+
+
+def image_jobs(claimed: List[str], post_dir: Path) -> List[Path]:
+    """
+    Return the source paths of the *claimed* images a post needs to publish.
+    """
+    return [post_dir / name for name in claimed]
+
+
+def compress_post_image(
+    src_path: Path, output_images_dir: Path, cache: DiskCache | None = None
+) -> bool:
+    """
+    Compress every responsive variant of a post image with the site-wide settings.
+    """
+    with profiling.stage("compress_image", src_path.parent.name):
+        ok = compress_variants(
+            src_path, output_images_dir, Config.image_widths, quality=85, cache=cache
+        )
+    if profiling.is_enabled():
+        profiling.count("images_compressed")
+        profiling.count("bytes_read", src_path.stat().st_size)
+    return ok
+
+
+def build_globals_hash(
+    template: Template, nav_links: str, asset_urls: Dict[str, str], config: Config
+) -> str:
+    """
+    Hash the inputs every rendered post shares: the template, navigation,
+    asset URLs and the image settings its `srcset` markup is built from.
+    """
+    image_settings = [
+        list(config.image_widths),
+        config.image_default_width,
+        config.image_sizes,
+    ]
+    return hash_bytes(
+        template.source.encode("utf-8"),
+        nav_links.encode("utf-8"),
+        json.dumps(asset_urls, sort_keys=True).encode("utf-8"),
+        json.dumps(image_settings).encode("utf-8"),
+    )
+
+
+def post_to_manifest_entry(
+    post: PostMeta, inputs_hash: str, inputs_stat: List[List], neighbours: List[str]
+) -> Dict:
+    """
+    Serialise what the build manifest keeps of *post*; its listing metadata
+    goes to the `MetadataIndex` instead (see `post_record`).
+    """
+    return {
+        "hash": inputs_hash,
+        "stat": inputs_stat,
+        "images": post.images,
+        "features": post.features,
+        "neighbours": neighbours,
+        "minify_saved": post.minify_saved,
+    }
+
+
+def post_record(post: PostMeta) -> PostRecord:
+    """
+    Return the listing metadata of *post* for the `MetadataIndex`.
+    """
+    return PostRecord(
+        title=post.title,
+        date=post.date.strftime("%Y-%m-%d"),
+        tags=post.tags,
+        excerpt=post.excerpt,
+        link=post.link_path.as_posix(),
+    )
+
+
+def post_from_record(
+    post_code: str, record: PostRecord, entry: Dict | None = None
+) -> PostMeta:
+    """
+    Rebuild the metadata of a post from its `MetadataIndex` record and, when
+    given, its build manifest entry (images, client features and the bytes
+    minification saved).
+    """
+    return PostMeta(
+        code=post_code,
+        title=record.title,
+        date=datetime.fromisoformat(record.date),
+        tags=record.tags,
+        excerpt=record.excerpt or "",
+        link_path=Path(record.link),
+        images={
+            name: [tuple(size) for size in ladder]
+            for name, ladder in (entry["images"] if entry else {}).items()
+        },
+        features=entry["features"] if entry else [],
+        minify_saved=entry["minify_saved"] if entry else 0,
+    )
+
+
+def is_post_fresh(
+    post_code: str,
+    entry: Dict | None,
+    inputs_hash: str,
+    posts_out_dir: Path,
+    images_out_dir: Path,
+) -> bool:
+    """
+    Return True if *post_code* was last built from *inputs_hash* and all of its
+    outputs are still present.
+    """
+    if not entry or entry.get("hash") != inputs_hash:
+        return False
+    if not (posts_out_dir / f"{post_code}.html").is_file():
+        return False
+    return all(
+        (images_out_dir / variant_name(name, width)).is_file()
+        for name, ladder in entry["images"].items()
+        for width, _ in ladder
     )
 
 
-def render_template(template: str, content: str, nav_links: str) -> str:
+def render_post(
+    post: Post,
+    template: Template,
+    nav_links: str,
+    output_dir: Path,
+    writer: OutputWriter,
+    asset_urls: Dict[str, str] | None = None,
+    neighbours: List[str] | None = None,
+) -> None:
     """
-    Replace placeholders in the template.
+    Write *post*'s rendered HTML to *output_dir* unless it is unchanged.
+
+    *neighbours* are the URLs of the posts before and after it by date, which
+    the page asks the browser to prefetch (see `hints.hint_slots`).
     """
-    return template.replace("{{ content }}", content).replace(
-        "{{ nav_links }}", nav_links
+    from hints import hint_slots
+
+    out_path = output_dir / f"{post.code}.html"
+    values = {"content": post.content_html, "nav_links": nav_links}
+    values.update(feature_slots(post.features, asset_urls or {}))
+    values.update(
+        hint_slots(post.content_html, post.features, asset_urls or {}, neighbours or [])
     )
+    with profiling.stage("write", post.code):
+        changed = writer.write_text(
+            out_path, template.iter_render(values), source="post"
+        )
+    if changed:
+        if profiling.is_enabled():
+            profiling.count("bytes_written", out_path.stat().st_size)
+        logging.info(f"Rendered {post.code} → {out_path.name}")
 
 
 def render_posts(
-    posts: List[Post], template: str, nav_links: str, output_dir: Path
+    posts: Iterable[Post],
+    template: Template,
+    nav_links: str,
+    output_dir: Path,
+    writer: OutputWriter | None = None,
+    asset_urls: Dict[str, str] | None = None,
 ) -> None:
     """
-    Write each post's rendered HTML to *output_dir*.
+    Write each post's rendered HTML to *output_dir*, skipping unchanged files.
     """
+    writer = writer or OutputWriter(output_dir, persistent=False)
     for post in posts:
-        rendered = render_template(template, post.content_html, nav_links)
-        out_path = output_dir / f"{post.code}.html"
-        out_path.write_text(rendered, encoding="utf-8")
-        logging.info(f"Rendered {post.code} → {out_path.name}")
+        render_post(post, template, nav_links, output_dir, writer, asset_urls)
 
 
-def build_landing_list(posts: List[Post]) -> str:
+def build_landing_list(posts: Sequence[PostMeta]) -> str:
     """
     Return the HTML snippet for the landing page list of posts.
     """
@@ -300,101 +722,1083 @@ def build_landing_list(posts: List[Post]) -> str:
     return '<div class="landing-list">\n' + "\n".join(items) + "\n</div>"
 
 
+def listing_url(page_number: int) -> str:
+    """
+    Return the URL of page *page_number* (1-based) of the post index.
+    """
+    return "/" if page_number == 1 else f"/page/{page_number}"
+
+
+def build_pagination(page_number: int, page_count: int) -> str:
+    """
+    Return the prev/next navigation for page *page_number* of *page_count*.
+    """
+    if page_count <= 1:
+        return ""
+
+    links = []
+    if page_number > 1:
+        links.append(
+            f'<a class="pagination-prev" rel="prev" '
+            f'href="{listing_url(page_number - 1)}">← Newer posts</a>'
+        )
+    links.append(
+        f'<span class="pagination-status">Page {page_number} of {page_count}</span>'
+    )
+    if page_number < page_count:
+        links.append(
+            f'<a class="pagination-next" rel="next" '
+            f'href="{listing_url(page_number + 1)}">Older posts →</a>'
+        )
+    return (
+        '<nav class="pagination" aria-label="Pagination">' + "".join(links) + "</nav>"
+    )
+
+
+def build_tag_index(
+    posts: List[PostMeta],
+) -> Dict[str, Tuple[str, List[PostMeta]]]:
+    """
+    Map each tag slug to its display name and posts, in one pass over *posts*.
+
+    Posts keep their order, so a date-sorted input gives date-sorted listings.
+    The display name is the first spelling seen for the tag.  Raises
+    `ValueError` if two different tags (see `tag_key`) end up with the same
+    slug, rather than listing their posts on one page.
+    """
+    index: Dict[str, Tuple[str, List[PostMeta]]] = {}
+    for post in posts:
+        for tag in dict.fromkeys(post.tags):
+            slug = tag_slug(tag)
+            name, tagged = index.setdefault(slug, (tag, []))
+            if tag_key(name) != tag_key(tag):
+                raise ValueError(
+                    f"Tags '{name}' and '{tag}' both map to tags/{slug}.html"
+                )
+            # A post tagged 'Python' and 'python' is listed once
+            if not tagged or tagged[-1] is not post:
+                tagged.append(post)
+    return index
+
+
+def minify_contents(
+    contents: Dict[str, List[str]],
+    minify_report: Dict[str, int],
+    executor: "PostExecutor | None" = None,
+) -> None:
+    """
+    Minify every entry of *contents* (output name → pieces) in place, on
+    *executor* when given, recording the bytes saved under the output name.
+    """
+    from minify import bytes_saved, minify_html
+
+    originals = {out_name: "".join(content) for out_name, content in contents.items()}
+    minified = (executor.map if executor else map)(minify_html, originals.values())
+    for (out_name, original), result in zip(originals.items(), minified):
+        minify_report[out_name] = bytes_saved(original, result)
+        contents[out_name] = [result]
+
+
+def log_minify_report(minify_report: Dict[str, int], shared_saved: int) -> None:
+    """
+    Log the bytes minification saved on each page, including posts reused
+    from the last build; *shared_saved* (the template and navigation) counts
+    towards every page.
+    """
+    total = 0
+    for out_name, saved in sorted(minify_report.items()):
+        total += saved + shared_saved
+        logging.info(f"Minified {out_name}: {saved + shared_saved} bytes saved")
+    if minify_report:
+        logging.info(
+            f"Minification saved {total} bytes over {len(minify_report)} pages"
+        )
+
+
+def render_listings(
+    posts: List[PostMeta],
+    template: Template,
+    nav_links: str,
+    output_dir: Path,
+    writer: OutputWriter | None = None,
+    asset_urls: Dict[str, str] | None = None,
+    posts_per_page: int = Config.posts_per_page,
+    minify_report: Dict[str, int] | None = None,
+    executor: "PostExecutor | None" = None,
+) -> Dict[str, List[str]]:
+    """
+    Render pages 2+ of the post index (`page/N.html`) and one listing per tag
+    (`tags/<slug>.html`); page 1 is the landing page from `render_pages`.
+
+    Listings that no longer exist are removed.  Returns the client features
+    each listing uses, keyed by output name.  With a *minify_report*, the
+    content is minified on *executor* (see `minify_contents`) and the bytes
+    saved are recorded under the output name.
+    """
+    writer = writer or OutputWriter(output_dir, persistent=False)
+    listings: Dict[str, List[str]] = {}
+    from hints import NEWEST_POSTS, hint_slots, post_url
+
+    listed: Dict[str, List[PostMeta]] = {}  # output name → posts it lists
+
+    page_count = max(1, -(-len(posts) // posts_per_page))
+    for page_number in range(2, page_count + 1):
+        start = (page_number - 1) * posts_per_page
+        out_name = f"page/{page_number}.html"
+        listed[out_name] = posts[start : start + posts_per_page]
+        listings[out_name] = [
+            '<h1 class="section-title">Posts</h1>',
+            build_landing_list(listed[out_name]),
+            build_pagination(page_number, page_count),
+        ]
+
+    for slug, (tag, tagged) in sorted(build_tag_index(posts).items()):
+        listed[f"tags/{slug}.html"] = tagged
+        listings[f"tags/{slug}.html"] = [
+            f'<h1 class="section-title">Posts tagged “{html.escape(tag)}”</h1>',
+            build_landing_list(tagged),
+        ]
+
+    # Features are detected before minification drops attribute quotes
+    listing_features = {
+        out_name: detect_features(content) for out_name, content in listings.items()
+    }
+    if minify_report is not None:
+        minify_contents(listings, minify_report, executor)
+
+    for out_name, content in listings.items():
+        values = {"content": content, "nav_links": nav_links}
+        values.update(feature_slots(listing_features[out_name], asset_urls or {}))
+        values.update(
+            hint_slots(
+                content,
+                listing_features[out_name],
+                asset_urls or {},
+                [post_url(post.code) for post in listed[out_name][:NEWEST_POSTS]],
+            )
+        )
+        if writer.write_text(
+            output_dir / out_name, template.iter_render(values), source="listing"
+        ):
+            logging.info(f"Rendered {out_name}")
+
+    writer.prune("listing", {output_dir / out_name for out_name in listings})
+    return listing_features
+
+
 def render_pages(
     pages: List[Page],
-    posts: List[Post],
-    template: str,
+    posts: List[PostMeta],
+    template: Template,
     nav_links: str,
     output_dir: Path,
-) -> None:
+    writer: OutputWriter | None = None,
+    asset_urls: Dict[str, str] | None = None,
+    posts_per_page: int = Config.posts_per_page,
+    minify_report: Dict[str, int] | None = None,
+    executor: "PostExecutor | None" = None,
+) -> Dict[str, List[str]]:
     """
-    Render the static pages (including index with post list).
+    Render the static pages; the index gets the first *posts_per_page* posts.
+
+    Returns the client features each page uses, keyed by output name.  With a
+    *minify_report*, the content is minified as in `render_listings`.  Every
+    page asks the browser to prefetch the newest posts.
     """
-    landing_list = build_landing_list(posts)
+    from hints import NEWEST_POSTS, hint_slots, post_url
+
+    writer = writer or OutputWriter(output_dir, persistent=False)
+    page_count = max(1, -(-len(posts) // posts_per_page))
+    landing_list = build_landing_list(posts[:posts_per_page])
+    newest_urls = [post_url(post.code) for post in posts[:NEWEST_POSTS]]
+    contents: Dict[str, List[str]] = {}
 
     for page in pages:
         page_path = Config.pages_dir / page.filename
         page_content = page_path.read_text(encoding="utf-8")
 
-        content = page_content
+        content = [page_content]
         if page.name == "index":
-            content += landing_list
+            content.append(landing_list)
+            content.append(build_pagination(1, page_count))
 
-        rendered_page = render_template(template, content, nav_links)
         out_name = "index.html" if page.name == "index" else page.filename
+        contents[out_name] = content
+
+    page_features = {
+        out_name: detect_features(content) for out_name, content in contents.items()
+    }
+    if minify_report is not None:
+        minify_contents(contents, minify_report, executor)
+
+    for out_name, content in contents.items():
         out_path = output_dir / out_name
-        out_path.write_text(rendered_page, encoding="utf-8")
-        logging.info(f"Rendered {out_name}")
+        values = {"content": content, "nav_links": nav_links}
+        values.update(feature_slots(page_features[out_name], asset_urls or {}))
+        values.update(
+            hint_slots(content, page_features[out_name], asset_urls or {}, newest_urls)
+        )
+        if writer.write_text(out_path, template.iter_render(values)):
+            logging.info(f"Rendered {out_name}")
+
+    return page_features
 
 
-def copy_static(static_dir: Path, output_dir: Path) -> None:
+def copy_static(
+    static_dir: Path, output_dir: Path, writer: OutputWriter | None = None
+) -> None:
     """
-    Copy all files (and sub-directories) from *static_dir* to *output_dir*.
+    Sync all files (and sub-directories) from *static_dir* to *output_dir*.
+
+    Unchanged files are left alone and outputs whose source was deleted are
+    removed.
     """
-    for item in static_dir.iterdir():
-        dest = output_dir / item.name
+    writer = writer or OutputWriter(output_dir, persistent=False)
+    synced = set()
+    for item in sorted(static_dir.rglob("*")):
         if item.is_file():
-            shutil.copy2(item, dest)
-        else:
-            shutil.copytree(item, dest, dirs_exist_ok=True)
+            dest = output_dir / item.relative_to(static_dir)
+            writer.sync_file(item, dest)
+            synced.add(dest)
+    writer.prune("static", synced)
+
+
+def copy_static_file(
+    path: Path, static_dir: Path, output_dir: Path, writer: OutputWriter
+) -> None:
+    """
+    Mirror a single file from *static_dir* to *output_dir*, removing the copy
+    if the source no longer exists.
+    """
+    dest = output_dir / path.relative_to(static_dir)
+    if path.is_file():
+        if writer.sync_file(path, dest):
+            logging.info(f"Copied {dest.relative_to(output_dir)}")
+    elif not path.exists():
+        writer.remove(dest)
+        logging.info(f"Removed {dest.relative_to(output_dir)}")
+
+
+class BuildCancelled(Exception):
+    """
+    Raised by `ssg` when its cancel event is set mid-build.
+    """
+
+
+def check_cancelled(cancel: threading.Event | None) -> None:
+    if cancel is not None and cancel.is_set():
+        raise BuildCancelled()
+
+
+class PostExecutor:
+    """
+    Map work over a process pool, or inline when parallelism would not help.
+
+    Results are always returned in input order.
+    """
+
+    def __init__(self, jobs: int, work_items: int):
+        self.jobs = jobs
+        self.pool = None
+        if jobs > 1 and work_items > 1:
+            # Only builds with real work pay for the multiprocessing import
+            from concurrent.futures import ProcessPoolExecutor
+
+            self.pool = ProcessPoolExecutor(max_workers=jobs)
+
+    def __enter__(self) -> "PostExecutor":
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        if self.pool is not None:
+            # On errors (or cancellation) drop the work that has not started
+            self.pool.shutdown(cancel_futures=exc_type is not None)
+
+    def map(self, fn: Callable, *iterables: Iterable) -> Iterator:
+        """
+        Lazily yield `fn(*args)` for each argument tuple.
+
+        At most `jobs * 4` calls are in flight, so results that the caller has
+        not consumed yet never pile up in memory.
+        """
+        if self.pool is None:
+            return map(fn, *iterables)
+        if not profiling.is_enabled():
+            return self._windowed(fn, *iterables)
+        return self._merge_profiles(
+            self._windowed(profiling.run_profiled, *iterables, prefix=(fn,))
+        )
+
+    def _windowed(
+        self, fn: Callable, *iterables: Iterable, prefix: Tuple = ()
+    ) -> Iterator:
+        pending: Deque = deque()
+        for args in zip(*iterables):
+            if len(pending) >= self.jobs * 4:
+                yield pending.popleft().result()
+            pending.append(self.pool.submit(fn, *prefix, *args))
+        while pending:
+            yield pending.popleft().result()
+
+    @staticmethod
+    def _merge_profiles(results: Iterator) -> Iterator:
+        for result, events, counters in results:
+            profiling._active.merge(events, counters)
+            yield result
+
+
+def search_doc(post: PostMeta) -> List[str]:
+    """
+    Return the search result entry of *post*: URL, title, date and excerpt.
+
+    static/search.js shows the excerpt as text, so its HTML entities are
+    decoded here.
+    """
+    url = "/" + post.link_path.as_posix().replace(".html", "")
+    excerpt = html.unescape(post.excerpt)
+    return [url, post.title, post.date.strftime("%Y-%m-%d"), excerpt]
 
 
-def ssg() -> None:
+def remove_stale_posts(
+    manifest: BuildManifest,
+    live_codes: Set[str],
+    posts_out_dir: Path,
+    writer: OutputWriter,
+    metadata_index: MetadataIndex | None = None,
+) -> None:
+    """
+    Forget every post outside *live_codes*, the posts parsed or reused in this
+    build, and delete their rendered HTML.
+
+    A post directory that lost its `index.md` is not live either, so its page
+    goes away even though the directory is still there.
+    """
+    if metadata_index is not None:
+        metadata_index.remove(set(metadata_index.codes()) - live_codes)
+    for post_code in sorted(set(manifest.posts) - live_codes):
+        del manifest.posts[post_code]
+        logging.info(f"Removed stale post {post_code}")
+    writer.prune(
+        "post", {posts_out_dir / f"{post_code}.html" for post_code in live_codes}
+    )
+
+
+def prune_images(manifest: BuildManifest, images_out_dir: Path) -> None:
+    """
+    Delete published image variants that no post in *manifest* links to.
+    """
+    expected = {
+        variant_name(name, width)
+        for entry in manifest.posts.values()
+        for name, ladder in entry["images"].items()
+        for width, _ in ladder
+    }
+    for path in images_out_dir.iterdir():
+        if path.is_file() and path.name not in expected:
+            path.unlink()
+            logging.info(f"Removed stale image {path.name}")
+
+
+def ssg(
+    force: bool = False,
+    jobs: int = 1,
+    only_posts: Set[str] | None = None,
+    copy_assets: bool = True,
+    cancel: threading.Event | None = None,
+    minify: bool = False,
+) -> None:
     """
     Run the static site generator.
+
+    Posts whose inputs match the build manifest are not re-processed unless
+    *force* is set.  With *jobs* > 1 post parsing and image compression are
+    spread over a process pool; the output is identical to a serial build.
+
+    When *only_posts* is given, posts outside it that are already in the
+    manifest are trusted without re-hashing their inputs.  *copy_assets*
+    controls whether `static/` is copied to the output.
+
+    CSS and JS from `static/` are also published under content-hashed names
+    that the template links to, and every HTML/CSS/JS/JSON/SVG output gets
+    precompressed `.gz` (and `.zst`) siblings.
+
+    Setting *cancel* stops the build between posts with `BuildCancelled`;
+    the manifest is then left as it was, so the next build redoes the work.
+
+    The search index under `search-index/` is updated from the term lists of
+    re-processed posts (see `search.update_search_index`).
+
+    With *minify*, the template and every rendered page go through
+    `minify_html` (spread over the worker processes) and the bytes saved on
+    each page are logged.
     """
+    # Loaded here rather than at import so `import main` stays cheap
+    from hints import adjacent_posts
+    from search import SEARCH_STATE_NAME, SearchState, update_search_index
+
     config = Config()
 
-    template = load_template(config.template_path)
     pages = discover_pages(config.pages_dir)
     nav_links = generate_nav_links(pages)
 
-    ensure_dirs(
-        {
-            config.output_dir,
-            config.output_dir / "posts",
-            config.output_dir / "posts" / "images",
-        }
+    posts_out_dir = config.output_dir / "posts"
+    images_out_dir = posts_out_dir / "images"
+    ensure_dirs({config.output_dir, posts_out_dir, images_out_dir})
+
+    writer = OutputWriter(config.output_dir)
+    with profiling.stage("fingerprint"):
+        asset_urls = fingerprint_assets(config.static_dir, config.output_dir, writer)
+    template_source = rewrite_asset_refs(
+        load_template(config.template_path).source, asset_urls
+    )
+    # The minified template and navigation change the globals hash, so
+    # toggling *minify* re-renders every post
+    shared_saved = 0
+    minify_report: Dict[str, int] | None = None
+    if minify:
+        from minify import bytes_saved, minify_html
+
+        minified = minify_html(template_source)
+        shared_saved = bytes_saved(template_source, minified)
+        template_source = minified
+        minified = minify_html(nav_links)
+        shared_saved += bytes_saved(nav_links, minified)
+        nav_links = minified
+        minify_report = {}
+    template = Template.compile(template_source)
+
+    image_cache = DiskCache(config.cache_dir / "images", config.image_cache_max_bytes)
+    markdown_cache = DiskCache(
+        config.cache_dir / "markdown", config.markdown_cache_max_bytes
+    )
+    highlight_cache = DiskCache(
+        config.cache_dir / "highlight", config.highlight_cache_max_bytes
+    )
+    probe_cache = DiskCache(config.cache_dir / "probe", config.probe_cache_max_bytes)
+    manifest = BuildManifest.load(config.output_dir / MANIFEST_NAME)
+    metadata_index = MetadataIndex(config.cache_dir / METADATA_INDEX_NAME)
+    search_state_path = config.output_dir / SEARCH_STATE_NAME
+    if force or not search_state_path.is_file():
+        # Without saved term lists, cached posts could not be searched
+        manifest.posts.clear()
+    manifest.reset_if_globals_changed(
+        build_globals_hash(template, nav_links, asset_urls, config)
     )
 
-    img_set: Set[str] = set()
-    posts: List[Post] = []
+    post_dirs = [
+        entry for entry in sorted(config.posts_dir.iterdir()) if entry.is_dir()
+    ]
+    indexed_codes = set(manifest.posts)
+    inputs_hashes: Dict[str, str] = {}
+    inputs_stats: Dict[str, List[List]] = {}
+    cached_posts: Dict[str, PostMeta] = {}
+    dirty_dirs: List[Path] = []
+
+    for entry in post_dirs:
+        cached = manifest.posts.get(entry.name)
+        record = None
+        if cached:
+            record = metadata_index.get(entry.name, entry / "index.md")
+            if record is None or record.excerpt is None:
+                # Listing metadata missing or stale: re-process the post
+                cached = None
+        if only_posts is not None and entry.name not in only_posts and cached:
+            cached_posts[entry.name] = post_from_record(entry.name, record, cached)
+            continue
 
-    for entry in sorted(config.posts_dir.iterdir()):
-        if not entry.is_dir():
+        with profiling.stage("hash_inputs", entry.name):
+            inputs_hashes[entry.name], inputs_stats[entry.name] = post_inputs_hash(
+                entry, cached
+            )
+        if is_post_fresh(
+            entry.name,
+            cached,
+            inputs_hashes[entry.name],
+            posts_out_dir,
+            images_out_dir,
+        ):
+            # Files touched without changing keep their hash under new stats
+            cached["stat"] = inputs_stats[entry.name]
+            cached_posts[entry.name] = post_from_record(entry.name, record, cached)
+        else:
+            dirty_dirs.append(entry)
+
+    # Post pages prefetch their neighbours by date, so a post whose neighbours
+    # changed is rendered again even though its own inputs did not change.
+    # Dates of dirty posts come from their front matter alone.
+    dates = {post_code: meta.date for post_code, meta in cached_posts.items()}
+    for entry in dirty_dirs:
+        if (entry / "index.md").is_file():
+            dates[entry.name] = read_post_header(entry.name, entry / "index.md")[1]
+    by_date = [entry.name for entry in post_dirs if entry.name in dates]
+    by_date.sort(key=lambda post_code: dates[post_code], reverse=True)
+    neighbours = adjacent_posts(by_date)
+    for post_code in sorted(cached_posts):
+        cached = manifest.posts[post_code]
+        if cached.get("neighbours") == neighbours[post_code]:
             continue
-        post = process_post(
-            entry.name, entry, config.output_dir / "posts" / "images", img_set
+        entry = config.posts_dir / post_code
+        if post_code not in inputs_hashes:
+            inputs_hashes[post_code], inputs_stats[post_code] = post_inputs_hash(
+                entry, cached
+            )
+        del cached_posts[post_code]
+        dirty_dirs.append(entry)
+    dirty_dirs.sort()
+
+    # With *minify*, pages and listings are minified on the executor too
+    page_jobs = len(pages) if minify else 0
+    with PostExecutor(jobs, len(dirty_dirs) + page_jobs) as executor:
+        # Parsed posts arrive in directory order; each is written out and
+        # reduced to its metadata before the next one is taken, so at most
+        # the executor's window of rendered posts is held in memory.
+        parsed = executor.map(
+            parse_post,
+            [d.name for d in dirty_dirs],
+            dirty_dirs,
+            [markdown_cache] * len(dirty_dirs),
+            [highlight_cache] * len(dirty_dirs),
+            [probe_cache] * len(dirty_dirs),
+            [minify] * len(dirty_dirs),
+        )
+
+        # Claim images in directory order so de-duplication is deterministic.
+        img_set: Set[str] = set()
+        posts: List[PostMeta] = []
+        search_terms: Dict[str, Dict[str, int]] = {}
+        fresh_count = 0
+        pending_images: List[Path] = []
+
+        for entry in post_dirs:
+            check_cancelled(cancel)
+            if entry.name in cached_posts:
+                meta = cached_posts.pop(entry.name)
+                img_set.update(meta.images)
+                posts.append(meta)
+                continue
+
+            post = next(parsed)
+            if post is None:
+                manifest.posts.pop(entry.name, None)
+                continue
+
+            claimed = claim_images(post, img_set)
+            pending_images.extend(image_jobs(claimed, entry))
+            render_post(
+                post,
+                template,
+                nav_links,
+                posts_out_dir,
+                writer,
+                asset_urls,
+                neighbours.get(entry.name),
+            )
+            meta = post.meta()
+            search_terms[entry.name] = post.terms
+            del post
+            posts.append(meta)
+            fresh_count += 1
+            manifest.posts[entry.name] = post_to_manifest_entry(
+                meta,
+                inputs_hashes[entry.name],
+                inputs_stats[entry.name],
+                neighbours.get(entry.name, []),
+            )
+            metadata_index.put(entry.name, entry / "index.md", post_record(meta))
+
+        for _ in executor.map(
+            compress_post_image,
+            pending_images,
+            [images_out_dir] * len(pending_images),
+            [image_cache] * len(pending_images),
+        ):
+            check_cancelled(cancel)
+        if pending_images:
+            image_cache.evict()
+        if dirty_dirs:
+            markdown_cache.evict()
+            highlight_cache.evict()
+            probe_cache.evict()
+
+        remove_stale_posts(
+            manifest,
+            {post.code for post in posts},
+            posts_out_dir,
+            writer,
+            metadata_index,
+        )
+        if only_posts is None:
+            prune_images(manifest, images_out_dir)
+        logging.info(
+            f"{fresh_count} of {len(posts)} posts changed since the last build"
+        )
+
+        posts.sort(key=lambda p: p.date, reverse=True)
+        check_cancelled(cancel)
+        with profiling.stage("render_pages"):
+            page_features = render_pages(
+                pages,
+                posts,
+                template,
+                nav_links,
+                config.output_dir,
+                writer,
+                asset_urls,
+                config.posts_per_page,
+                minify_report,
+                executor,
+            )
+        with profiling.stage("render_listings"):
+            page_features.update(
+                render_listings(
+                    posts,
+                    template,
+                    nav_links,
+                    config.output_dir,
+                    writer,
+                    asset_urls,
+                    config.posts_per_page,
+                    minify_report,
+                    executor,
+                )
+            )
+    if minify_report is not None:
+        # Cached posts report what minifying them saved when they were built
+        minify_report.update(
+            {post.link_path.as_posix(): post.minify_saved for post in posts}
+        )
+        log_minify_report(minify_report, shared_saved)
+    if search_terms or indexed_codes - {post.code for post in posts}:
+        with profiling.stage("search_index"):
+            search_state = SearchState.load(search_state_path)
+            update_search_index(
+                search_state,
+                search_terms,
+                {post.code: search_doc(post) for post in posts},
+                config.output_dir,
+                writer,
+            )
+            search_state.save()
+    page_features.update({post.link_path.as_posix(): post.features for post in posts})
+    write_asset_manifest(page_features, asset_urls, config.output_dir, writer)
+    if copy_assets:
+        with profiling.stage("copy_static"):
+            copy_static(config.static_dir, config.output_dir, writer)
+    with profiling.stage("precompress"):
+        precompress_outputs(config.output_dir, writer)
+    writer.save()
+    metadata_index.close()
+    manifest.save()
+    logging.info(f"Wrote {writer.written} files, {writer.skipped} unchanged")
+
+
+@dataclass
+class ChangeSet:
+    """
+    Watched paths sorted by what they affect; `full` means the template, a
+    fingerprinted asset or an unknown file changed.
+    """
+
+    post_codes: Set[str] = field(default_factory=set)
+    static_files: Set[Path] = field(default_factory=set)
+    pages_changed: bool = False
+    full: bool = False
+
+
+def classify_changes(changed_paths: Iterable[Path], config: Config) -> ChangeSet:
+    changes = ChangeSet()
+    for path in changed_paths:
+        path = Path(path).resolve()
+        if path == config.template_path or (
+            path.is_relative_to(config.static_dir)
+            and path.suffix in FINGERPRINT_SUFFIXES
+        ):
+            changes.full = True
+        elif path.is_relative_to(config.static_dir):
+            changes.static_files.add(path)
+        elif path.is_relative_to(config.pages_dir):
+            changes.pages_changed = True
+        elif path.is_relative_to(config.posts_dir) and path != config.posts_dir:
+            changes.post_codes.add(path.relative_to(config.posts_dir).parts[0])
+        else:
+            changes.full = True
+    return changes
+
+
+def rebuild(
+    changed_paths: Iterable[Path],
+    cancel: threading.Event | None = None,
+    minify: bool = False,
+) -> None:
+    """
+    Rebuild only the outputs affected by *changed_paths*.
+
+    A post edit re-renders that post plus the pages, a static file is copied
+    (or removed) on its own, and anything else, such as the template or a
+    fingerprinted CSS/JS file, falls back to a regular incremental build.
+    *cancel* and *minify* are passed on to `ssg`.
+    """
+    config = Config()
+    changes = classify_changes(changed_paths, config)
+
+    if changes.full:
+        ssg(cancel=cancel, minify=minify)
+        return
+
+    if changes.post_codes or changes.pages_changed:
+        ssg(
+            only_posts=changes.post_codes,
+            copy_assets=False,
+            cancel=cancel,
+            minify=minify,
+        )
+
+    writer = OutputWriter(config.output_dir)
+    for path in sorted(changes.static_files):
+        copy_static_file(path, config.static_dir, config.output_dir, writer)
+    precompress_outputs(config.output_dir, writer)
+    writer.save()
+
+
+class LazySite:
+    """
+    Builds the site for the dev server on demand instead of up front.
+
+    Startup only reads each post's front matter (enough for the index and tag
+    listings) and syncs `static/`.  A post is parsed and written through
+    `parse_post`/`render_post` the first time its URL is requested, and each
+    image is compressed the first time one of its variants is requested.
+    Rendered posts stay memoized until `rebuild` sees their inputs change.
+
+    Methods may be called from several threads; `lock` serialises the work.
+    """
+
+    def __init__(self):
+        self.config = Config()
+        self.lock = threading.Lock()
+        self.posts_out_dir = self.config.output_dir / "posts"
+        self.images_out_dir = self.posts_out_dir / "images"
+        ensure_dirs({self.config.output_dir, self.posts_out_dir, self.images_out_dir})
+        self.writer = OutputWriter(self.config.output_dir)
+        self.image_cache = DiskCache(
+            self.config.cache_dir / "images", self.config.image_cache_max_bytes
+        )
+        self.markdown_cache = DiskCache(
+            self.config.cache_dir / "markdown", self.config.markdown_cache_max_bytes
+        )
+        self.highlight_cache = DiskCache(
+            self.config.cache_dir / "highlight", self.config.highlight_cache_max_bytes
+        )
+        self.probe_cache = DiskCache(
+            self.config.cache_dir / "probe", self.config.probe_cache_max_bytes
+        )
+        self.metadata_index = MetadataIndex(self.config.cache_dir / METADATA_INDEX_NAME)
+        self.posts: Dict[str, PostMeta] = {}
+        self.image_owners: Dict[str, str] = {}  # image name → first post using it
+        self.rendered: Set[str] = set()
+        self.neighbours: Dict[str, List[str]] = {}  # post → adjacent post URLs
+        self.variant_sources: Dict[str, Path] = {}  # variant file → source image
+        self.compressed: Set[Path] = set()
+
+        self.load_globals()
+        self.index_posts()
+        self.render_listings()
+        self.writer.save()
+        self.metadata_index.commit()
+
+    def load_globals(self) -> None:
+        """
+        Sync `static/`, fingerprint assets and load the template and navigation.
+        """
+        self.pages = discover_pages(self.config.pages_dir)
+        self.nav_links = generate_nav_links(self.pages)
+        copy_static(self.config.static_dir, self.config.output_dir, self.writer)
+        self.asset_urls = fingerprint_assets(
+            self.config.static_dir, self.config.output_dir, self.writer
+        )
+        self.template = Template.compile(
+            rewrite_asset_refs(
+                load_template(self.config.template_path).source, self.asset_urls
+            )
+        )
+
+    def index_posts(self) -> None:
+        self.posts.clear()
+        for entry in sorted(self.config.posts_dir.iterdir()):
+            if entry.is_dir():
+                self.index_post(entry.name)
+        self.index_images()
+
+    def index_post(self, post_code: str) -> None:
+        """
+        Read the listing metadata of *post_code*, forgetting it if it is gone.
+        """
+        index_md = self.config.posts_dir / post_code / "index.md"
+        if not index_md.is_file():
+            self.metadata_index.remove([post_code])
+            if self.posts.pop(post_code, None) is not None:
+                self.rendered.discard(post_code)
+                self.writer.remove(self.posts_out_dir / f"{post_code}.html")
+            return
+        record = self.metadata_index.get(post_code, index_md)
+        if record is None:
+            title, date_obj, tags = read_post_header(post_code, index_md)
+            record = PostRecord(
+                title=title,
+                date=date_obj.strftime("%Y-%m-%d"),
+                tags=tags,
+                excerpt=None,
+                link=(Path("posts") / f"{post_code}.html").as_posix(),
+            )
+            self.metadata_index.put(post_code, index_md, record)
+        self.posts[post_code] = post_from_record(post_code, record)
+
+    def index_images(self) -> None:
+        """
+        Decide which post publishes each image name, like `claim_images` does.
+        """
+        self.image_owners = {}
+        for post_code in sorted(self.posts):
+            for path in sorted((self.config.posts_dir / post_code).iterdir()):
+                if path.suffix.lower() in IMAGE_SUFFIXES:
+                    self.image_owners.setdefault(path.name, post_code)
+
+    def render_listings(self) -> None:
+        from hints import adjacent_posts
+
+        # Same order as `ssg`: by date, ties in directory order
+        posts = sorted(
+            (self.posts[post_code] for post_code in sorted(self.posts)),
+            key=lambda p: p.date,
+            reverse=True,
+        )
+        self.neighbours = adjacent_posts([post.code for post in posts])
+        render_pages(
+            self.pages,
+            posts,
+            self.template,
+            self.nav_links,
+            self.config.output_dir,
+            self.writer,
+            self.asset_urls,
+            self.config.posts_per_page,
+        )
+        render_listings(
+            posts,
+            self.template,
+            self.nav_links,
+            self.config.output_dir,
+            self.writer,
+            self.asset_urls,
+            self.config.posts_per_page,
         )
-        if post:
-            posts.append(post)
 
-    posts.sort(key=lambda p: p.date, reverse=True)
-    render_posts(posts, template, nav_links, config.output_dir / "posts")
-    render_pages(pages, posts, template, nav_links, config.output_dir)
-    copy_static(config.static_dir, config.output_dir)
+    def _post_code(self, url_path: str) -> str | None:
+        if not url_path.startswith("/posts/"):
+            return None
+        post_code = url_path[len("/posts/") :].removesuffix(".html")
+        return post_code if post_code in self.posts else None
+
+    def _image_source(self, url_path: str) -> Path | None:
+        if not url_path.startswith("/posts/images/"):
+            return None
+        return self.variant_sources.get(url_path[len("/posts/images/") :])
+
+    def pending(self, url_path: str) -> bool:
+        """
+        Return True if serving *url_path* first needs `ensure`.
+        """
+        post_code = self._post_code(url_path)
+        if post_code is not None:
+            return post_code not in self.rendered
+        source = self._image_source(url_path)
+        return source is not None and source not in self.compressed
+
+    def ensure(self, url_path: str) -> List[Path]:
+        """
+        Render the post or compress the image behind *url_path* if needed and
+        return the output files written.
+        """
+        with self.lock:
+            post_code = self._post_code(url_path)
+            if post_code is not None and post_code not in self.rendered:
+                return self.render(post_code)
+            source = self._image_source(url_path)
+            if source is not None and source not in self.compressed:
+                compress_post_image(source, self.images_out_dir, self.image_cache)
+                self.compressed.add(source)
+                return [
+                    self.images_out_dir / name
+                    for name, src in self.variant_sources.items()
+                    if src == source
+                ]
+            return []
+
+    def render(self, post_code: str) -> List[Path]:
+        post_dir = self.config.posts_dir / post_code
+        post = parse_post(
+            post_code,
+            post_dir,
+            self.markdown_cache,
+            self.highlight_cache,
+            self.probe_cache,
+        )
+        if post is None:
+            return []
+        self.metadata_index.put(post_code, post_dir / "index.md", post_record(post))
+
+        # Shared image names are published from the post that owns them
+        for name, ladder in post.images.items():
+            owner = self.image_owners.get(name, post_code)
+            for width, _ in ladder:
+                self.variant_sources[variant_name(name, width)] = (
+                    self.config.posts_dir / owner / name
+                )
+        post.images = {
+            name: ladder
+            for name, ladder in post.images.items()
+            if self.image_owners.get(name) == post_code
+        }
+        render_post(
+            post,
+            self.template,
+            self.nav_links,
+            self.posts_out_dir,
+            self.writer,
+            self.asset_urls,
+            self.neighbours.get(post_code),
+        )
+        self.rendered.add(post_code)
+        self.writer.save()
+        self.metadata_index.commit()
+        return [self.posts_out_dir / f"{post_code}.html"]
+
+    def rebuild(
+        self, changed_paths: Iterable[Path], cancel: threading.Event | None = None
+    ) -> None:
+        """
+        Bring the outputs that were already produced up to date with
+        *changed_paths*; posts nobody has requested stay unrendered.
+        """
+        changes = classify_changes(changed_paths, self.config)
+        with self.lock:
+            if changes.full:
+                self.load_globals()
+                self.index_posts()
+                stale = set(self.rendered)
+                self.compressed.clear()
+            else:
+                for post_code in changes.post_codes:
+                    self.index_post(post_code)
+                if changes.post_codes:
+                    self.index_images()
+                stale = changes.post_codes & self.rendered
+                self.compressed = {
+                    source
+                    for source in self.compressed
+                    if source.parent.name not in changes.post_codes
+                }
+                for path in sorted(changes.static_files):
+                    copy_static_file(
+                        path,
+                        self.config.static_dir,
+                        self.config.output_dir,
+                        self.writer,
+                    )
+
+            self.rendered -= stale
+            if changes.full or changes.pages_changed or changes.post_codes:
+                old_neighbours = self.neighbours
+                self.render_listings()
+                # Rendered posts prefetch their neighbours, which may have moved
+                moved = {
+                    post_code
+                    for post_code in self.rendered
+                    if self.neighbours.get(post_code) != old_neighbours.get(post_code)
+                }
+                self.rendered -= moved
+                stale |= moved
+            for post_code in sorted(stale):
+                check_cancelled(cancel)
+                if post_code in self.posts:
+                    self.render(post_code)
+            self.writer.save()
+            self.metadata_index.commit()
 
 
 if __name__ == "__main__":
     import argparse
-    import asyncio
 
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "--dev", action="store_true", help="Run dev server with live reload"
     )
+    parser.add_argument(
+        "--lazy",
+        action="store_true",
+        help="Dev server only: start at once and render each post on first request",
+    )
     parser.add_argument("--host", default="127.0.0.1", help="Dev server host")
     parser.add_argument("--port", type=int, default=8000, help="Dev server port")
+    parser.add_argument(
+        "--force", action="store_true", help="Ignore the build manifest and rebuild all"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Worker processes for post processing (0 = one per CPU)",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="Minify the HTML output and report the bytes saved (ignored with --lazy)",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="build-trace.json",
+        metavar="TRACE",
+        help="Time every stage and post; write a Chrome trace (default: %(const)s)",
+    )
     args = parser.parse_args()
 
-    ssg()
-
     live_env = os.getenv("LIVE_RELOAD")
-    if args.dev or (live_env and live_env != "0"):
+    dev = args.dev or args.lazy or bool(live_env and live_env != "0")
+
+    if not args.lazy:
+        profiler = profiling.enable() if args.profile else None
+        with profiling.stage("build"):
+            ssg(
+                force=args.force,
+                jobs=args.jobs or os.cpu_count() or 1,
+                minify=args.minify,
+            )
+        if profiler is not None:
+            print(profiler.summary())
+            profiler.write_trace(Path(args.profile))
+            logging.info(f"Wrote trace to {args.profile}")
+
+    if dev:
         # Import dev server only when requested so CI remains unaffected
+        import asyncio
+
         from dev_server import run_dev
 
+        site = LazySite() if args.lazy else None
         try:
-            asyncio.run(run_dev(ssg, host=args.host, port=args.port))
+            asyncio.run(
+                run_dev(
+                    functools.partial(ssg, minify=args.minify),
+                    host=args.host,
+                    port=args.port,
+                    rebuild_func=(
+                        site.rebuild
+                        if site
+                        else functools.partial(rebuild, minify=args.minify)
+                    ),
+                    lazy=site,
+                )
+            )
         except KeyboardInterrupt:
             print("Dev server stopped")
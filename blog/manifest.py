@@ -0,0 +1,128 @@
+import hashlib
+import json
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = ".build-manifest.json"
+
+# Bump whenever the rendering code changes in a way that should invalidate
+# every previously built post.
+MANIFEST_VERSION = 11
+
+
+def hash_bytes(*chunks: bytes) -> str:
+    """
+    Return the hex SHA-256 digest of *chunks*, each one length-prefixed so
+    that ("ab", "c") and ("a", "bc") never collide.
+    """
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(len(chunk).to_bytes(8, "little"))
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_post_inputs(post_dir: Path) -> str:
+    """
+    Hash every file in *post_dir* (its `index.md` and images) by name and content.
+    """
+    chunks: List[bytes] = []
+    for entry in sorted(post_dir.iterdir()):
+        if entry.is_file():
+            chunks.append(entry.name.encode("utf-8"))
+            chunks.append(entry.read_bytes())
+    return hash_bytes(*chunks)
+
+
+def stat_post_inputs(post_dir: Path) -> List[List]:
+    """
+    Return `[name, size, mtime_ns]` for every file in *post_dir*, sorted by name.
+    """
+    stats = []
+    for entry in sorted(post_dir.iterdir()):
+        if entry.is_file():
+            st = entry.stat()
+            stats.append([entry.name, st.st_size, st.st_mtime_ns])
+    return stats
+
+
+def post_inputs_hash(post_dir: Path, entry: Dict | None) -> Tuple[str, List[List]]:
+    """
+    Return the input hash of *post_dir* and the file stats it was taken at.
+
+    When every file still has the size and mtime recorded in the manifest
+    *entry*, the recorded hash is reused instead of reading the files, so a
+    no-op build never reads post sources or images.
+    """
+    stats = stat_post_inputs(post_dir)
+    if entry and entry.get("stat") == stats and entry.get("hash"):
+        return entry["hash"], stats
+    return hash_post_inputs(post_dir), stats
+
+
+@dataclass
+class BuildManifest:
+    """
+    Persistent record of the inputs each post was last built from.
+
+    `globals_hash` covers everything shared by all posts (template, navigation,
+    image settings); when it changes every post entry is discarded.  `posts`
+    maps a post code to its input hash plus the metadata needed to list it
+    without re-processing.
+    """
+
+    path: Path
+    globals_hash: str = ""
+    posts: Dict[str, Dict] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: Path) -> "BuildManifest":
+        """
+        Read the manifest at *path*, returning an empty one if it is missing,
+        unreadable or from another manifest version.
+        """
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return cls(path=path)
+
+        if data.get("version") != MANIFEST_VERSION:
+            logging.info("Build manifest version changed, rebuilding everything")
+            return cls(path=path)
+
+        return cls(
+            path=path,
+            globals_hash=data.get("globals_hash", ""),
+            posts=data.get("posts", {}),
+        )
+
+    def save(self) -> None:
+        """
+        Write the manifest back to disk.
+        """
+        data = {
+            "version": MANIFEST_VERSION,
+            "globals_hash": self.globals_hash,
+            "posts": self.posts,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(
+            json.dumps(data, indent=1, sort_keys=True), encoding="utf-8"
+        )
+
+    def reset_if_globals_changed(self, globals_hash: str) -> None:
+        """
+        Drop every post entry if the shared inputs differ from the last build.
+        """
+        if self.globals_hash != globals_hash:
+            if self.posts:
+                logging.info(
+                    "Template, navigation or image settings changed, "
+                    "rebuilding all posts"
+                )
+            self.posts.clear()
+            self.globals_hash = globals_hash
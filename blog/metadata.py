@@ -0,0 +1,187 @@
+import json
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from manifest import hash_bytes
+
+METADATA_INDEX_NAME = "metadata.sqlite3"
+
+# Bump when the stored fields or the way they are parsed change
+METADATA_VERSION = 1
+
+TITLE_RE = re.compile(r"^#\s*(.*)", re.MULTILINE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    code TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    title TEXT NOT NULL,
+    date TEXT NOT NULL,
+    tags TEXT NOT NULL,
+    excerpt TEXT,
+    link TEXT NOT NULL
+)
+"""
+
+
+def load_yaml(text: str):
+    """
+    Parse YAML with the libyaml-backed loader when PyYAML was built with it.
+    """
+    import yaml
+
+    return yaml.load(text, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+
+def read_header_text(path: Path) -> str:
+    """
+    Return the start of the markdown file at *path*: the front matter and the
+    body up to the line the title is taken from.
+
+    The title is the first `#` heading (see `main.extract_title`), so the file
+    is read line by line until one is complete; only posts without any
+    heading are read to the end.  `main.parse_post_header` gives the same
+    title, date and tags for this prefix as for the whole file.
+    """
+    lines: List[str] = []
+    body_start = None  # index in `lines` where the body begins
+    body_prefix = ""  # body text on the line that closes the front matter
+    seen_heading = False
+    with path.open(encoding="utf-8") as fh:
+        for line in fh:
+            lines.append(line)
+            if body_start is None:
+                if not lines[0].startswith("---"):
+                    body_start = 0
+                else:
+                    # Same rule as `extract_front_matter`: the next "---"
+                    # anywhere after the opening one ends the front matter
+                    text = "".join(lines)
+                    closing = text.find("---", 3)
+                    if closing == -1:
+                        continue
+                    body_start = len(lines)
+                    body_prefix = text[closing + 3 :]
+                    seen_heading = "#" in body_prefix
+                    if not seen_heading:
+                        continue
+            seen_heading = seen_heading or line.startswith("#")
+            if seen_heading:
+                body = body_prefix + "".join(lines[body_start:])
+                match = TITLE_RE.search(body)
+                # Done once the heading's line is complete
+                if match and match.end() < len(body):
+                    break
+    return "".join(lines)
+
+
+@dataclass(frozen=True)
+class PostRecord:
+    """
+    The listing metadata of a post as stored in the index.
+
+    `excerpt` is None for records made from the header alone; those are
+    enough for listings but not for a full build, which needs the excerpt of
+    the rendered post.
+    """
+
+    title: str
+    date: str  # YYYY-MM-DD
+    tags: List[str]
+    excerpt: str | None
+    link: str
+
+
+class MetadataIndex:
+    """
+    SQLite table of post listing metadata, keyed by post code and the hash of
+    its `index.md`.
+
+    A record is only returned while it matches the current source: an
+    unchanged size and mtime are trusted as is, otherwise the file is hashed
+    and compared.  Listings can then be rebuilt without reading post bodies.
+    """
+
+    def __init__(self, path: Path):
+        import sqlite3
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        if version != METADATA_VERSION:
+            self.db.execute("DROP TABLE IF EXISTS posts")
+            self.db.execute(f"PRAGMA user_version = {METADATA_VERSION}")
+        self.db.execute(SCHEMA)
+        self.db.commit()
+        self._rows: Dict[str, tuple] | None = None
+
+    def _all_rows(self) -> Dict[str, tuple]:
+        # One query for the whole table; builds look up every post anyway
+        if self._rows is None:
+            self._rows = {
+                row[0]: row[1:] for row in self.db.execute("SELECT * FROM posts")
+            }
+        return self._rows
+
+    def get(self, post_code: str, source: Path) -> PostRecord | None:
+        """
+        Return the record of *post_code* if it was made from *source* as it
+        is now, else None.
+        """
+        row = self._all_rows().get(post_code)
+        if row is None:
+            return None
+        size, mtime_ns, digest, title, date, tags, excerpt, link = row
+        try:
+            st = source.stat()
+        except OSError:
+            return None
+        if (st.st_size, st.st_mtime_ns) != (size, mtime_ns):
+            if hash_bytes(source.read_bytes()) != digest:
+                return None
+            self.db.execute(
+                "UPDATE posts SET size = ?, mtime_ns = ? WHERE code = ?",
+                (st.st_size, st.st_mtime_ns, post_code),
+            )
+            self._rows[post_code] = (st.st_size, st.st_mtime_ns) + row[2:]
+        return PostRecord(title, date, json.loads(tags), excerpt, link)
+
+    def put(self, post_code: str, source: Path, record: PostRecord) -> None:
+        """
+        Store *record* as the metadata of *post_code* made from *source*.
+        """
+        st = source.stat()
+        row = (
+            st.st_size,
+            st.st_mtime_ns,
+            hash_bytes(source.read_bytes()),
+            record.title,
+            record.date,
+            json.dumps(record.tags),
+            record.excerpt,
+            record.link,
+        )
+        self.db.execute(
+            "INSERT OR REPLACE INTO posts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (post_code,) + row,
+        )
+        self._all_rows()[post_code] = row
+
+    def remove(self, post_codes: Iterable[str]) -> None:
+        for post_code in post_codes:
+            self.db.execute("DELETE FROM posts WHERE code = ?", (post_code,))
+            self._all_rows().pop(post_code, None)
+
+    def codes(self) -> List[str]:
+        return sorted(self._all_rows())
+
+    def commit(self) -> None:
+        self.db.commit()
+
+    def close(self) -> None:
+        self.db.commit()
+        self.db.close()
@@ -0,0 +1,128 @@
+import re
+from typing import List, Tuple
+
+# Elements whose contents are copied byte for byte.  Mermaid diagrams normally
+# sit inside a <pre>, but markdown2 versions differ, so bare ones count too.
+PROTECTED_RE = re.compile(
+    r"<(pre|code|script|style|textarea)\b[^>]*>.*?</\1\s*>"
+    r"|<div\b[^>]*\bclass=[\"']?mermaid[\"'\s>][^>]*>.*?</div\s*>",
+    re.DOTALL | re.IGNORECASE,
+)
+
+# Highlighters open every block with an empty span before <code> (the stylesheet
+# hides it with `pre > span:empty`); it is markup only, not part of the code.
+LEADING_SPAN_RE = re.compile(r"^(<pre\b[^>]*>)<span></span>", re.IGNORECASE)
+
+COMMENT_RE = re.compile(r"<!--(?!\[if).*?-->", re.DOTALL)
+EMPTY_SPAN_RE = re.compile(
+    r"""<span(?:\s+class=(?:"[^"]*"|'[^']*'))?\s*></span>""", re.IGNORECASE
+)
+
+# A start or end tag, allowing `>` inside quoted attribute values
+TAG_RE = re.compile(r"""</?[a-zA-Z!][^>"']*(?:(?:"[^"]*"|'[^']*')[^>"']*)*>""")
+TAG_NAME_RE = re.compile(r"</?!?([a-zA-Z0-9]+)")
+TAG_PART_RE = re.compile(r"""=("[^"]*"|'[^']*')|"[^"]*"|'[^']*'|\s+""")
+
+# Whitespace that is significant in text (no-break spaces are left alone)
+SPACE_RE = re.compile(r"[ \t\n\r\f]+")
+
+# Attribute values that need no quotes: no whitespace, quotes, `=`, `<`, `>`
+# or backticks, and no trailing slash that could be read as `/>`
+UNQUOTED_RE = re.compile(r"/?[\w.:#-]+(?:/+[\w.:#-]+)*")
+
+# Whitespace next to these tags never renders
+# fmt: off
+BLOCK_TAGS = {
+    "article", "aside", "blockquote", "body", "dd", "div", "dl", "doctype",
+    "dt", "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4",
+    "h5", "h6", "head", "header", "hr", "html", "li", "link", "main", "meta",
+    "nav", "ol", "p", "pre", "script", "section", "style", "table", "tbody",
+    "td", "tfoot", "th", "thead", "title", "tr", "ul",
+}
+# fmt: on
+
+
+def _minify_tag(tag: str) -> str:
+    """
+    Collapse the whitespace between attributes of *tag* and drop the quotes
+    around values that do not need them.
+    """
+
+    def _repl(match: re.Match) -> str:
+        quoted = match.group(1)
+        if quoted is not None:
+            value = quoted[1:-1]
+            follower = tag[match.end() : match.end() + 1]
+            if UNQUOTED_RE.fullmatch(value) and (follower == ">" or follower.isspace()):
+                return "=" + value
+            return match.group(0)
+        if match.group(0)[0] in "\"'":
+            return match.group(0)
+        return " "
+
+    tag = TAG_PART_RE.sub(_repl, tag)
+    if tag.endswith(" >"):
+        tag = tag[:-2] + ">"
+    return tag
+
+
+def _tokenize(html_text: str) -> List[Tuple[str, str, bool]]:
+    """
+    Split *html_text* into (kind, text, is_block) tokens, where kind is "raw"
+    for protected elements, "tag" or "text".
+    """
+    tokens: List[Tuple[str, str, bool]] = []
+
+    def _add_markup(chunk: str) -> None:
+        chunk = EMPTY_SPAN_RE.sub("", COMMENT_RE.sub("", chunk))
+        pos = 0
+        for match in TAG_RE.finditer(chunk):
+            if match.start() > pos:
+                tokens.append(("text", chunk[pos : match.start()], False))
+            name = TAG_NAME_RE.match(match.group(0))
+            is_block = bool(name) and name.group(1).lower() in BLOCK_TAGS
+            tokens.append(("tag", match.group(0), is_block))
+            pos = match.end()
+        if pos < len(chunk):
+            tokens.append(("text", chunk[pos:], False))
+
+    pos = 0
+    for match in PROTECTED_RE.finditer(html_text):
+        _add_markup(html_text[pos : match.start()])
+        block = LEADING_SPAN_RE.sub(r"\1", match.group(0))
+        is_block = not block[:5].lower().startswith("<code")
+        tokens.append(("raw", block, is_block))
+        pos = match.end()
+    _add_markup(html_text[pos:])
+    return tokens
+
+
+def minify_html(html_text: str) -> str:
+    """
+    Return *html_text* without insignificant whitespace, comments and empty
+    spans, and with attribute quotes dropped where that is safe.
+
+    The contents of `<pre>`, `<code>`, `<script>`, `<style>`, `<textarea>`
+    and mermaid blocks are left byte-exact (apart from the empty span
+    highlighters put before `<code>`).  Runs of whitespace in text shrink to
+    one space, and disappear entirely next to block-level tags.
+    """
+    tokens = _tokenize(html_text)
+    out: List[str] = []
+    for i, (kind, text, _) in enumerate(tokens):
+        if kind == "raw":
+            out.append(text)
+        elif kind == "tag":
+            out.append(_minify_tag(text))
+        else:
+            text = SPACE_RE.sub(" ", text)
+            if i == 0 or tokens[i - 1][2]:
+                text = text.lstrip(" ")
+            if i == len(tokens) - 1 or tokens[i + 1][2]:
+                text = text.rstrip(" ")
+            out.append(text)
+    return "".join(out)
+
+
+def bytes_saved(before: str, after: str) -> int:
+    return len(before.encode("utf-8")) - len(after.encode("utf-8"))
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, Set
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_INDEX_NAME = ".output-index.json"
+
+# Copy in chunks of this size when `copy_file_range` is available
+COPY_CHUNK = 16 * 1024 * 1024
+
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stat_key(path: Path) -> list[int] | None:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def copy_file(src: Path, dst: Path) -> None:
+    """
+    Copy *src* to *dst* with `copy_file_range` where the kernel supports it.
+    """
+    if not hasattr(os, "copy_file_range"):
+        shutil.copyfile(src, dst)
+        return
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        try:
+            while os.copy_file_range(fsrc.fileno(), fdst.fileno(), COPY_CHUNK):
+                pass
+        except OSError:
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+            shutil.copyfileobj(fsrc, fdst)
+
+
+class OutputWriter:
+    """
+    Writes build outputs only when their content changed.
+
+    A persistent index maps each output (relative to `root`) to its stat key and
+    SHA-256, so unchanged files are recognised without re-reading them or
+    writing anything.  New content is written to a temporary file next to the target and moved into
+    place with `os.replace`, so readers never see a partial file and untouched
+    outputs keep their mtime.
+    """
+
+    def __init__(self, root: Path, persistent: bool = True):
+        self.root = root
+        self.index_path = root / OUTPUT_INDEX_NAME if persistent else None
+        self.index: Dict[str, Dict] = {}
+        self.written = 0
+        self.skipped = 0
+        if self.index_path is not None:
+            try:
+                self.index = json.loads(self.index_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self.index = {}
+
+    def save(self) -> None:
+        if self.index_path is None:
+            return
+        self.index_path.write_text(
+            json.dumps(self.index, sort_keys=True), encoding="utf-8"
+        )
+
+    def _rel(self, path: Path) -> str:
+        return path.relative_to(self.root).as_posix()
+
+    def current_hash(self, path: Path) -> str | None:
+        """
+        Return the SHA-256 of the output at *path*, trusting the index when the
+        file's stat key still matches.
+        """
+        key = stat_key(path)
+        if key is None:
+            return None
+        entry = self.index.get(self._rel(path))
+        if entry and entry["stat"] == key:
+            return entry["sha256"]
+        return hash_file(path)
+
+    def _record(self, path: Path, digest: str, source: str | None = None) -> None:
+        self.index[self._rel(path)] = {
+            "stat": stat_key(path),
+            "sha256": digest,
+            "source": source,
+        }
+
+    def write_text(
+        self, path: Path, pieces: Iterable[str], source: str | None = None
+    ) -> bool:
+        """
+        Write *pieces* to *path* as UTF-8 unless the result is byte-identical to
+        the existing file.  Returns True if the file was (re)written.
+
+        *source* tags the output so that `prune` can find it later.
+        """
+        return self.write_bytes(
+            path, (piece.encode("utf-8") for piece in pieces), source
+        )
+
+    def write_bytes(
+        self, path: Path, chunks: Iterable[bytes], source: str | None = None
+    ) -> bool:
+        """
+        Write *chunks* to *path* unless they hash to the existing file's SHA-256;
+        nothing touches the disk for an unchanged output.
+        """
+        chunks = list(chunks)
+        digest = hashlib.sha256()
+        for chunk in chunks:
+            digest.update(chunk)
+        if self.current_hash(path) == digest.hexdigest():
+            self.skipped += 1
+            self._record(path, digest.hexdigest(), source)
+            return False
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.writelines(chunks)
+            os.chmod(tmp_name, 0o644)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        self.written += 1
+        self._record(path, digest.hexdigest(), source)
+        return True
+
+    def sync_file(self, src: Path, dst: Path, source: str = "static") -> bool:
+        """
+        Make *dst* a copy of *src*.
+
+        Never a hardlink: a source edited in place would silently change
+        the output too, including fingerprinted names that promise immutable
+        content.  Returns True if *dst* changed.  The source's stat key is remembered so an
+        untouched source is skipped without hashing either file.
+        """
+        rel = self._rel(dst)
+        src_key = stat_key(src)
+        entry = self.index.get(rel)
+        if (
+            entry
+            and entry.get("src_stat") == src_key
+            and entry["stat"] == stat_key(dst)
+        ):
+            self.skipped += 1
+            return False
+
+        digest = hash_file(src)
+        changed = self.current_hash(dst) != digest
+        if changed:
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            tmp = dst.with_name(f".tmp-{dst.name}")
+            tmp.unlink(missing_ok=True)
+            copy_file(src, tmp)
+            shutil.copystat(src, tmp)
+            os.replace(tmp, dst)
+            self.written += 1
+        else:
+            self.skipped += 1
+        self._record(dst, digest, source)
+        self.index[rel]["src_stat"] = src_key
+        return changed
+
+    def remove(self, path: Path) -> None:
+        path.unlink(missing_ok=True)
+        self.index.pop(self._rel(path), None)
+
+    def prune(self, source: str, keep: Set[Path]) -> None:
+        """
+        Delete outputs produced from *source* that are not in *keep*.
+        """
+        keep_rel = {self._rel(path) for path in keep}
+        for rel, entry in list(self.index.items()):
+            if entry.get("source") == source and rel not in keep_rel:
+                self.remove(self.root / rel)
+                logging.info(f"Removed stale {rel}")
@@ -0,0 +1,165 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Callable, ContextManager, Dict, Iterator, List, Tuple
+
+# The profiler recording in this process, if `--profile` is on
+_active: "Profiler | None" = None
+
+
+class Profiler:
+    """
+    Collects wall/CPU timings for nested build stages plus byte and item counters.
+
+    Each finished stage is stored as an event with its inclusive wall time and
+    its self time (wall time minus nested stages), so the summary does not
+    count `highlight` twice when it runs inside `markdown`.
+    """
+
+    def __init__(self):
+        self.events: List[Dict] = []
+        self.counters: Dict[str, int] = defaultdict(int)
+        self._stack: List[List[int]] = []  # child wall time per open stage
+
+    @contextmanager
+    def stage(self, name: str, post: str | None = None) -> Iterator[None]:
+        self._stack.append([0])
+        wall_start = time.perf_counter_ns()
+        cpu_start = time.thread_time_ns()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter_ns() - wall_start
+            cpu = time.thread_time_ns() - cpu_start
+            child_wall = self._stack.pop()[0]
+            if self._stack:
+                self._stack[-1][0] += wall
+            self.events.append(
+                {
+                    "name": name,
+                    "post": post,
+                    "ts": wall_start // 1000,
+                    "dur": wall // 1000,
+                    "self": (wall - child_wall) // 1000,
+                    "cpu": cpu // 1000,
+                    "pid": os.getpid(),
+                    "tid": threading.get_native_id(),
+                }
+            )
+
+    def merge(self, events: List[Dict], counters: Dict[str, int]) -> None:
+        """
+        Fold in the events and counters recorded by a worker process.
+        """
+        self.events.extend(events)
+        for name, amount in counters.items():
+            self.counters[name] += amount
+
+    def summary(self, top: int = 10) -> str:
+        """
+        Return a plain-text table of stage totals and the slowest posts.
+        """
+        stages: Dict[str, List[int]] = defaultdict(lambda: [0, 0, 0, 0])
+        posts: Dict[str, int] = defaultdict(int)
+        for event in self.events:
+            totals = stages[event["name"]]
+            totals[0] += 1
+            totals[1] += event["self"]
+            totals[2] += event["dur"]
+            totals[3] += event["cpu"]
+            if event["post"]:
+                posts[event["post"]] += event["self"]
+
+        lines = [
+            f"{'stage':<16}{'calls':>8}{'self ms':>12}{'wall ms':>12}{'cpu ms':>12}"
+        ]
+        for name, (calls, self_us, wall_us, cpu_us) in sorted(
+            stages.items(), key=lambda item: item[1][1], reverse=True
+        ):
+            lines.append(
+                f"{name:<16}{calls:>8}{self_us / 1000:>12.1f}"
+                f"{wall_us / 1000:>12.1f}{cpu_us / 1000:>12.1f}"
+            )
+
+        if posts:
+            lines.append("")
+            lines.append(f"{'slowest posts':<40}{'ms':>12}")
+            for post, self_us in sorted(
+                posts.items(), key=lambda item: item[1], reverse=True
+            )[:top]:
+                lines.append(f"{post:<40}{self_us / 1000:>12.1f}")
+
+        if self.counters:
+            lines.append("")
+            for name, amount in sorted(self.counters.items()):
+                lines.append(f"{name:<28}{amount:>12}")
+
+        return "\n".join(lines)
+
+    def write_trace(self, path: Path) -> None:
+        """
+        Write the events in Chrome trace-event format (chrome://tracing, Perfetto).
+        """
+        trace = [
+            {
+                "name": event["name"],
+                "cat": "build",
+                "ph": "X",
+                "ts": event["ts"],
+                "dur": event["dur"],
+                "pid": event["pid"],
+                "tid": event["tid"],
+                "args": {"post": event["post"], "cpu_us": event["cpu"]},
+            }
+            for event in self.events
+        ]
+        path.write_text(
+            json.dumps({"traceEvents": trace, "otherData": dict(self.counters)}),
+            encoding="utf-8",
+        )
+
+
+def enable() -> Profiler:
+    """
+    Start recording in this process and return the profiler.
+    """
+    global _active
+    _active = Profiler()
+    return _active
+
+
+def is_enabled() -> bool:
+    return _active is not None
+
+
+def stage(name: str, post: str | None = None) -> ContextManager:
+    """
+    Time a build stage, or do nothing when profiling is off.
+    """
+    if _active is None:
+        return nullcontext()
+    return _active.stage(name, post)
+
+
+def count(name: str, amount: int = 1) -> None:
+    if _active is not None:
+        _active.counters[name] += amount
+
+
+def run_profiled(fn: Callable, *args) -> Tuple[object, List[Dict], Dict[str, int]]:
+    """
+    Call *fn* in a worker process with a fresh profiler and return its result
+    along with the recorded events and counters, for `Profiler.merge`.
+    """
+    global _active
+    previous = _active
+    _active = Profiler()
+    try:
+        result = fn(*args)
+        return result, _active.events, dict(_active.counters)
+    finally:
+        _active = previous
@@ -1,47 +1,109 @@
 import re
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterator, List, Sequence, Tuple
 import logging
 
+from images import variant_name
+
 logger = logging.getLogger(__name__)
 
 
-def add_line_numbers(html_content: str) -> str:
-    """
-    Idempotently add line-number spans to code blocks.
+CODEHILITE_OPEN = '<div class="codehilite">'
+CODEHILITE_PRE = "<pre><span></span><code>"
+PLAIN_OPEN = "<pre><code>"
+CODE_CLOSE = "</code></pre>"
+DIV_CLOSE = "</div>"
+LN_MARKER = 'class="ln"'
+NUMBERED_OPEN = '<div class="codehilite"><pre><span></span><code>'
+NUMBERED_CLOSE = "</code></pre></div>"
+
 
-    If the block already contains a span with class "ln" we skip it.
+def _skip_space(text: str, pos: int) -> int:
+    while pos < len(text) and text[pos].isspace():
+        pos += 1
+    return pos
+
+
+def _match_codehilite(text: str, start: int) -> Tuple[int, int, int] | None:
     """
+    Match a `codehilite` block opening at *start*.
 
-    def add_lines_to_block(code_block: str) -> str:
-        lines = code_block.rstrip("\n").split("\n")
-        numbered_lines = [f'<span class="ln">{i}</span>{line}' for i, line in enumerate(lines, 1)]
-        return "\n".join(numbered_lines)
+    Returns (body_start, body_end, block_end) or None.  Like the non-greedy
+    regex this replaces, the body runs to the first `</code></pre>` that is
+    followed (after optional whitespace) by `</div>`.
+    """
+    pos = _skip_space(text, start + len(CODEHILITE_OPEN))
+    if not text.startswith(CODEHILITE_PRE, pos):
+        return None
+    body_start = pos + len(CODEHILITE_PRE)
+
+    search = body_start
+    while True:
+        body_end = text.find(CODE_CLOSE, search)
+        if body_end == -1:
+            return None
+        pos = _skip_space(text, body_end + len(CODE_CLOSE))
+        if text.startswith(DIV_CLOSE, pos):
+            return body_start, body_end, pos + len(DIV_CLOSE)
+        search = body_end + 1
 
-    def process_codehilite(match: re.Match) -> str:
-        code_block = match.group(1)
-        if "class=\"ln\"" in code_block or "<span class=\"ln\"" in code_block:
-            return match.group(0)
-        numbered = add_lines_to_block(code_block)
-        return f'<div class="codehilite"><pre><span></span><code>{numbered}</code></pre></div>'
-
-    html_content = re.sub(
-        r'<div class="codehilite">\s*<pre><span></span><code>(.*?)</code></pre>\s*</div>',
-        process_codehilite,
-        html_content,
-        flags=re.DOTALL,
-    )
-
-    def process_plain(match: re.Match) -> str:
-        code_block = match.group(1)
-        if "class=\"ln\"" in code_block or "<span class=\"ln\"" in code_block:
-            return match.group(0)
-        numbered = add_lines_to_block(code_block)
-        return f'<div class="codehilite"><pre><span></span><code>{numbered}</code></pre></div>'
 
-    html_content = re.sub(r"<pre><code>(.*?)</code></pre>", process_plain, html_content, flags=re.DOTALL)
+def add_line_numbers(html_content: str) -> str:
+    """
+    Idempotently add line-number spans to code blocks.
 
-    return html_content
+    Both `codehilite` blocks and plain `<pre><code>` blocks are rewritten in a
+    single left-to-right scan into one output buffer.  If a block already
+    contains a span with class "ln" we skip it.
+    """
+    text = html_content
+    find = text.find
+    out: List[str] = []
+    copied = 0  # end of the text already copied to *out*
+    scan = 0  # where to look for the next block
+    next_hilite = find(CODEHILITE_OPEN)
+    next_plain = find(PLAIN_OPEN)
+
+    while next_hilite != -1 or next_plain != -1:
+        if next_hilite != -1 and (next_plain == -1 or next_hilite < next_plain):
+            start = next_hilite
+            match = _match_codehilite(text, start)
+        else:
+            start = next_plain
+            body_start = start + len(PLAIN_OPEN)
+            body_end = find(CODE_CLOSE, body_start)
+            match = None
+            if body_end != -1:
+                match = (body_start, body_end, body_end + len(CODE_CLOSE))
+
+        if match is None:
+            scan = start + 1
+        else:
+            body_start, body_end, block_end = match
+            if find(LN_MARKER, body_start, body_end) == -1:
+                lines = text[body_start:body_end].rstrip("\n").split("\n")
+                out.append(text[copied:start])
+                out.append(NUMBERED_OPEN)
+                out.append(
+                    "\n".join(
+                        f'<span class="ln">{i}</span>{line}'
+                        for i, line in enumerate(lines, 1)
+                    )
+                )
+                out.append(NUMBERED_CLOSE)
+                copied = block_end
+            scan = block_end
+
+        if next_hilite != -1 and next_hilite < scan:
+            next_hilite = find(CODEHILITE_OPEN, scan)
+        if next_plain != -1 and next_plain < scan:
+            next_plain = find(PLAIN_OPEN, scan)
+
+    if not out:
+        return text
+    out.append(text[copied:])
+    return "".join(out)
 
 
 def inject_tags_and_fix_image_paths(html_content: str, tags: List[str], post_code: str) -> str:
@@ -77,3 +139,104 @@ def inject_tags_and_fix_image_paths(html_content: str, tags: List[str], post_cod
     html_content = img_pattern.sub(_repl_img, html_content)
 
     return html_content
+
+
+IMG_TAG_RE = re.compile(r"<img\b([^>]*?)\s*/?>", flags=re.IGNORECASE)
+SRC_ATTR_RE = re.compile(r"\s+src=(['\"])(.*?)\1", flags=re.IGNORECASE)
+
+
+def rewrite_images(
+    html_content: str,
+    variants: Dict[str, List[Tuple[int, int]]],
+    base_url: str,
+    sizes: str,
+    default_width: int,
+) -> str:
+    """
+    Point local `<img>` tags at their published WEBP variants.
+
+    Images listed in *variants* (filename → [(width, height), ...]) get a
+    `srcset`/`sizes` pair, intrinsic `width`/`height` and lazy loading.  Other
+    local sources are only prefixed with *base_url*; absolute URLs and data URIs
+    are left untouched.
+    """
+
+    def _repl_img(match: re.Match) -> str:
+        attrs = match.group(1)
+        src_match = SRC_ATTR_RE.search(attrs)
+        if not src_match:
+            return match.group(0)
+        src = src_match.group(2)
+        if src.startswith(("/", "http://", "https://", "data:")):
+            return match.group(0)
+
+        name = Path(src).name
+        rest = attrs[: src_match.start()] + attrs[src_match.end() :]
+        if name not in variants:
+            return f'<img src="{base_url}{src}"{rest} />'
+
+        ladder = variants[name]
+        fitting = [v for v in ladder if v[0] <= default_width]
+        width, height = fitting[-1] if fitting else ladder[0]
+        srcset = ", ".join(f"{base_url}{variant_name(name, w)} {w}w" for w, _ in ladder)
+        extra = ""
+        if "loading=" not in rest:
+            extra += ' loading="lazy"'
+        if "decoding=" not in rest:
+            extra += ' decoding="async"'
+        return (
+            f'<img src="{base_url}{variant_name(name, width)}" srcset="{srcset}" '
+            f'sizes="{sizes}" width="{width}" height="{height}"{extra}{rest} />'
+        )
+
+    return IMG_TAG_RE.sub(_repl_img, html_content)
+
+
+PLACEHOLDER_RE = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+SlotValue = str | Sequence[str]
+
+
+@dataclass(frozen=True)
+class Template:
+    """
+    A template parsed once into literal segments and `{{ name }}` slots.
+
+    `segments` always has one more entry than `slots`; rendering interleaves
+    them.  Slots without a value are emitted verbatim, so unknown placeholders
+    survive exactly as written.
+    """
+
+    source: str
+    segments: Tuple[str, ...]
+    slots: Tuple[Tuple[str, str], ...]  # (name, placeholder text)
+
+    @classmethod
+    def compile(cls, source: str) -> "Template":
+        segments = []
+        slots = []
+        pos = 0
+        for match in PLACEHOLDER_RE.finditer(source):
+            segments.append(source[pos : match.start()])
+            slots.append((match.group(1), match.group(0)))
+            pos = match.end()
+        segments.append(source[pos:])
+        return cls(source=source, segments=tuple(segments), slots=tuple(slots))
+
+    def iter_render(self, values: Dict[str, SlotValue]) -> Iterator[str]:
+        """
+        Yield the rendered output piece by piece without joining it.
+
+        A slot value may be a string or a sequence of strings.
+        """
+        for segment, (name, placeholder) in zip(self.segments, self.slots):
+            yield segment
+            value = values.get(name, placeholder)
+            if isinstance(value, str):
+                yield value
+            else:
+                yield from value
+        yield self.segments[-1]
+
+    def render(self, **values: SlotValue) -> str:
+        return "".join(self.iter_render(values))
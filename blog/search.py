@@ -0,0 +1,229 @@
+import html
+import json
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Tuple
+
+from output import OutputWriter
+
+# Output directory of the index (not `search/`, which would shadow search.html)
+SEARCH_DIR = "search-index"
+SEARCH_INDEX_NAME = "index.json"
+
+# Per-post term lists kept between builds so only changed posts are re-read
+SEARCH_STATE_NAME = ".search-terms.json"
+
+# Bump when tokenizing, stemming or the file layout changes; static/search.js
+# checks it against the `version` field of index.json.
+SEARCH_VERSION = 1
+
+# Terms are sharded by their first characters; the browser only fetches the
+# shards its query terms fall into.
+SHARD_PREFIX_LENGTH = 2
+
+TITLE_WEIGHT = 5
+TAG_WEIGHT = 5
+MAX_TERM_LENGTH = 32
+
+TOKEN_RE = re.compile(r"[^\W_]+")
+PRE_RE = re.compile(r"<pre\b.*?</pre>", re.DOTALL | re.IGNORECASE)
+TAG_RE = re.compile(r"<[^>]+>")
+
+# fmt: off
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from",
+    "has", "have", "he", "i", "if", "in", "into", "is", "it", "its", "me",
+    "my", "no", "not", "of", "on", "or", "our", "so", "that", "the", "their",
+    "them", "then", "there", "these", "they", "this", "to", "was", "we",
+    "were", "what", "when", "which", "will", "with", "you", "your",
+}
+# fmt: on
+
+# (suffix, replacement), first match wins.  Kept deliberately small so that
+# static/search.js can apply exactly the same rules to queries.
+STEM_RULES = (
+    ("ational", "ate"),
+    ("ization", "ize"),
+    ("ingly", ""),
+    ("edly", ""),
+    ("sses", "ss"),
+    ("ies", "y"),
+    ("ied", "y"),
+    ("ing", ""),
+    ("ed", ""),
+    ("ly", ""),
+    ("s", ""),
+)
+# Words ending like this keep their final "s" (class, status, analysis)
+KEEP_S = ("ss", "us", "is")
+MIN_STEM_LENGTH = 3
+
+
+def stem(word: str) -> str:
+    """
+    Strip a common English suffix from *word*, e.g. 'caching' → 'cach',
+    'queries' → 'query'.  Stems shorter than `MIN_STEM_LENGTH` are not made.
+    """
+    for suffix, replacement in STEM_RULES:
+        if not word.endswith(suffix):
+            continue
+        if suffix == "s" and word.endswith(KEEP_S):
+            return word
+        stemmed = word[: len(word) - len(suffix)] + replacement
+        return stemmed if len(stemmed) >= MIN_STEM_LENGTH else word
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Return the stemmed search terms of *text*, in order, without stopwords.
+    """
+    terms = []
+    for token in TOKEN_RE.findall(text.lower()):
+        if len(token) < 2 or token in STOPWORDS:
+            continue
+        terms.append(stem(token)[:MAX_TERM_LENGTH])
+    return terms
+
+
+def html_to_text(html_text: str) -> str:
+    """
+    Return the readable text of rendered post HTML, leaving out code blocks.
+    """
+    return html.unescape(TAG_RE.sub(" ", PRE_RE.sub(" ", html_text)))
+
+
+def post_terms(title: str, tags: Iterable[str], html_text: str) -> Dict[str, int]:
+    """
+    Return term → weight for a post.  Body terms count once per occurrence;
+    title and tag terms are boosted.  The excerpt is the opening of the body,
+    so it is covered by the body text.
+    """
+    weights = Counter(tokenize(html_to_text(html_text)))
+    for term in tokenize(title):
+        weights[term] += TITLE_WEIGHT
+    for tag in tags:
+        for term in tokenize(tag):
+            weights[term] += TAG_WEIGHT
+    return dict(sorted(weights.items()))
+
+
+def shard_key(term: str) -> str:
+    return term[:SHARD_PREFIX_LENGTH]
+
+
+def delta_encode(postings: List[Tuple[int, int]]) -> List[int]:
+    """
+    Flatten (doc id, weight) pairs into `[gap, weight, gap, weight, ...]`,
+    where each gap is the difference from the previous doc id.
+    """
+    encoded = []
+    previous = 0
+    for doc_id, weight in sorted(postings):
+        encoded.extend((doc_id - previous, weight))
+        previous = doc_id
+    return encoded
+
+
+@dataclass
+class SearchState:
+    """
+    The term list and stable document id of every indexed post.
+
+    Ids are never reused, so adding or removing a post leaves the postings of
+    every other post (and every shard it does not touch) unchanged.
+    """
+
+    path: Path
+    next_id: int = 0
+    posts: Dict[str, Dict] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: Path) -> "SearchState":
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return cls(path=path)
+        if data.get("version") != SEARCH_VERSION:
+            return cls(path=path)
+        return cls(path=path, next_id=data["next_id"], posts=data["posts"])
+
+    def save(self) -> None:
+        data = {"version": SEARCH_VERSION, "next_id": self.next_id, "posts": self.posts}
+        self.path.write_text(json.dumps(data, sort_keys=True), encoding="utf-8")
+
+
+def update_search_index(
+    state: SearchState,
+    changed: Dict[str, Dict[str, int]],
+    docs: Dict[str, List[str]],
+    output_dir: Path,
+    writer: OutputWriter,
+) -> None:
+    """
+    Bring the sharded index in *output_dir* up to date.
+
+    *changed* maps the code of each re-processed post to its `post_terms`;
+    *docs* maps every live post code to its result entry (URL, title, date,
+    excerpt).  Posts in *state* but not in *docs* are dropped.  Only shards
+    containing a term of a changed or dropped post are re-encoded; shards
+    left without terms are removed.
+    """
+    affected: Set[str] = set()
+    for post_code in sorted(set(state.posts) - set(docs)):
+        affected.update(map(shard_key, state.posts.pop(post_code)["terms"]))
+    for post_code, terms in sorted(changed.items()):
+        entry = state.posts.get(post_code)
+        if entry is None:
+            entry = state.posts[post_code] = {"id": state.next_id}
+            state.next_id += 1
+        else:
+            affected.update(map(shard_key, entry["terms"]))
+        entry["terms"] = terms
+        affected.update(map(shard_key, terms))
+
+    index_dir = output_dir / SEARCH_DIR
+    all_keys: Set[str] = set()
+    shards: Dict[str, Dict[str, List[Tuple[int, int]]]] = {}
+    for entry in state.posts.values():
+        for term, weight in entry["terms"].items():
+            key = shard_key(term)
+            all_keys.add(key)
+            if key in affected or not (index_dir / f"{key}.json").is_file():
+                postings = shards.setdefault(key, {}).setdefault(term, [])
+                postings.append((entry["id"], weight))
+
+    for key, terms in sorted(shards.items()):
+        encoded = {term: delta_encode(terms[term]) for term in sorted(terms)}
+        writer.write_text(
+            index_dir / f"{key}.json",
+            [json.dumps(encoded, separators=(",", ":"), ensure_ascii=False)],
+            source="search",
+        )
+
+    index = {
+        "version": SEARCH_VERSION,
+        "prefix": SHARD_PREFIX_LENGTH,
+        "shards": sorted(all_keys),
+        "docs": {
+            str(state.posts[post_code]["id"]): docs[post_code]
+            for post_code in sorted(docs)
+            if post_code in state.posts
+        },
+    }
+    index_path = index_dir / SEARCH_INDEX_NAME
+    writer.write_text(
+        index_path,
+        [json.dumps(index, separators=(",", ":"), ensure_ascii=False)],
+        source="search",
+    )
+    writer.prune(
+        "search", {index_dir / f"{key}.json" for key in all_keys} | {index_path}
+    )
+    logging.info(
+        f"Search index: {len(state.posts)} posts, re-encoded {len(shards)} of "
+        f"{len(all_keys)} shards"
+    )
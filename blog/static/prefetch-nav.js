@@ -1,5 +1,8 @@
-// Link prefetching on hover for snappier navigation
+// Link prefetching on hover for snappier navigation.  Browsers that support
+// speculation rules get them from the build (see hints.py) instead.
 const prefetchedLinks = new Set();
+const hasSpeculationRules =
+  HTMLScriptElement.supports?.("speculationrules") ?? false;
 
 function prefetchLink(url) {
   if (prefetchedLinks.has(url)) return;
@@ -14,6 +17,8 @@ function prefetchLink(url) {
 
 // Add hover listeners to all internal links
 document.addEventListener("mouseover", (e) => {
+  if (hasSpeculationRules) return;
+
   const link = e.target.closest("a");
   if (!link) return;
 
@@ -0,0 +1,225 @@
+// Client side of the sharded search index written by search.py.  Tokenizing
+// and stemming must stay identical to search.py, or queries will miss terms.
+const SEARCH_VERSION = 1;
+const INDEX_DIR = "/search-index";
+const MAX_RESULTS = 20;
+const DEBOUNCE_MS = 120;
+
+const STOPWORDS = new Set([
+  "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from",
+  "has", "have", "he", "i", "if", "in", "into", "is", "it", "its", "me",
+  "my", "no", "not", "of", "on", "or", "our", "so", "that", "the", "their",
+  "them", "then", "there", "these", "they", "this", "to", "was", "we",
+  "were", "what", "when", "which", "will", "with", "you", "your",
+]);
+
+const STEM_RULES = [
+  ["ational", "ate"],
+  ["ization", "ize"],
+  ["ingly", ""],
+  ["edly", ""],
+  ["sses", "ss"],
+  ["ies", "y"],
+  ["ied", "y"],
+  ["ing", ""],
+  ["ed", ""],
+  ["ly", ""],
+  ["s", ""],
+];
+const KEEP_S = ["ss", "us", "is"];
+const MIN_STEM_LENGTH = 3;
+const MAX_TERM_LENGTH = 32;
+
+function stem(word) {
+  for (const [suffix, replacement] of STEM_RULES) {
+    if (!word.endsWith(suffix)) continue;
+    if (suffix === "s" && KEEP_S.some((keep) => word.endsWith(keep))) {
+      return word;
+    }
+    const stemmed = word.slice(0, word.length - suffix.length) + replacement;
+    return stemmed.length >= MIN_STEM_LENGTH ? stemmed : word;
+  }
+  return word;
+}
+
+function words(text) {
+  return (text.toLowerCase().match(/[\p{L}\p{N}]+/gu) || []).filter(
+    (word) => word.length >= 2 && !STOPWORDS.has(word),
+  );
+}
+
+let indexPromise = null;
+const shardPromises = new Map();
+
+function loadIndex() {
+  indexPromise ??= fetch(`${INDEX_DIR}/index.json`)
+    .then((response) => {
+      if (!response.ok) throw new Error(`HTTP ${response.status}`);
+      return response.json();
+    })
+    .then((index) => {
+      if (index.version !== SEARCH_VERSION) {
+        throw new Error("Search index version mismatch");
+      }
+      index.shardKeys = new Set(index.shards);
+      index.docCount = Object.keys(index.docs).length;
+      return index;
+    });
+  return indexPromise;
+}
+
+function loadShard(key) {
+  if (!shardPromises.has(key)) {
+    shardPromises.set(
+      key,
+      fetch(`${INDEX_DIR}/${encodeURIComponent(key)}.json`).then((response) =>
+        response.ok ? response.json() : {},
+      ),
+    );
+  }
+  return shardPromises.get(key);
+}
+
+// Postings are [gap, weight, gap, weight, ...] with gaps between doc ids
+function decodePostings(encoded) {
+  const postings = new Map();
+  let docId = 0;
+  for (let i = 0; i < encoded.length; i += 2) {
+    docId += encoded[i];
+    postings.set(docId, encoded[i + 1]);
+  }
+  return postings;
+}
+
+async function search(query) {
+  const index = await loadIndex();
+  const queryWords = [...new Set(words(query))];
+  if (!queryWords.length) return [];
+
+  const keyOf = (term) => term.slice(0, index.prefix);
+  const keys = new Set(
+    queryWords.map((word) => keyOf(stem(word).slice(0, MAX_TERM_LENGTH))),
+  );
+  const shards = new Map();
+  await Promise.all(
+    [...keys]
+      .filter((key) => index.shardKeys.has(key))
+      .map(async (key) => shards.set(key, await loadShard(key))),
+  );
+
+  let scores = null;
+  queryWords.forEach((word, i) => {
+    const term = stem(word).slice(0, MAX_TERM_LENGTH);
+    const shard = shards.get(keyOf(term)) || {};
+    // The last word may still be being typed, so it also matches as a prefix
+    const isLast = i === queryWords.length - 1;
+    const matching = Object.keys(shard).filter(
+      (candidate) =>
+        candidate === term || (isLast && candidate.startsWith(word)),
+    );
+
+    const termScores = new Map();
+    for (const candidate of matching) {
+      const postings = decodePostings(shard[candidate]);
+      const idf = Math.log(1 + index.docCount / postings.size);
+      for (const [docId, weight] of postings) {
+        termScores.set(docId, (termScores.get(docId) || 0) + weight * idf);
+      }
+    }
+
+    // Every word has to match
+    if (scores === null) {
+      scores = termScores;
+    } else {
+      const both = new Map();
+      for (const [docId, score] of scores) {
+        if (termScores.has(docId)) both.set(docId, score + termScores.get(docId));
+      }
+      scores = both;
+    }
+  });
+
+  return [...scores]
+    .sort((a, b) => b[1] - a[1])
+    .slice(0, MAX_RESULTS)
+    .map(([docId]) => index.docs[docId]);
+}
+
+function formatDate(isoDate) {
+  return new Date(`${isoDate}T00:00:00`).toLocaleDateString("en-US", {
+    month: "short",
+    day: "2-digit",
+    year: "numeric",
+  });
+}
+
+// Same markup as the landing list, plus the excerpt
+function renderResult([url, title, date, excerpt]) {
+  const item = document.createElement("div");
+  item.className = "landing-item";
+
+  const link = document.createElement("a");
+  link.className = "landing-title";
+  link.href = url;
+  link.textContent = title;
+
+  const meta = document.createElement("div");
+  meta.className = "post-meta";
+  const time = document.createElement("time");
+  time.dateTime = date;
+  time.textContent = formatDate(date);
+  meta.appendChild(time);
+
+  item.append(link, meta);
+  if (excerpt) {
+    const summary = document.createElement("p");
+    summary.className = "search-excerpt";
+    summary.textContent = excerpt;
+    item.appendChild(summary);
+  }
+  return item;
+}
+
+const input = document.getElementById("search-input");
+const results = document.getElementById("search-results");
+const status = document.getElementById("search-status");
+let latestQuery = "";
+let debounceTimer = null;
+
+async function runSearch(query) {
+  latestQuery = query;
+  const url = new URL(window.location.href);
+  if (query) url.searchParams.set("q", query);
+  else url.searchParams.delete("q");
+  history.replaceState(null, "", url);
+
+  if (!words(query).length) {
+    results.replaceChildren();
+    status.textContent = "";
+    return;
+  }
+  try {
+    const found = await search(query);
+    if (query !== latestQuery) return; // a newer query is in flight
+    results.replaceChildren(...found.map(renderResult));
+    status.textContent = found.length
+      ? `${found.length} result${found.length === 1 ? "" : "s"}`
+      : "No posts found";
+  } catch (error) {
+    status.textContent = "Search is unavailable right now";
+    console.error(error);
+  }
+}
+
+if (input && results && status) {
+  input.addEventListener("input", () => {
+    clearTimeout(debounceTimer);
+    debounceTimer = setTimeout(() => runSearch(input.value.trim()), DEBOUNCE_MS);
+  });
+
+  const initial = new URLSearchParams(window.location.search).get("q");
+  if (initial) {
+    input.value = initial;
+    runSearch(initial.trim());
+  }
+}
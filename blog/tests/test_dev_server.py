@@ -0,0 +1,84 @@
+"""
+Tests for how the dev server loads build outputs.
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dev_server import (  # noqa: E402
+    MAX_INLINE_BYTES,
+    RELOAD_SCRIPT,
+    ArtifactStore,
+    file_handler,
+    load_artifact,
+    make_etag,
+)
+
+
+class LoadArtifactTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+
+    def test_large_html_keeps_the_reload_script(self):
+        path = self.root / "post.html"
+        path.write_text("<body>" + "x" * MAX_INLINE_BYTES + "</body>", encoding="utf-8")
+        artifact = load_artifact(path)
+        self.assertIsNotNone(artifact.body)
+        self.assertIn(RELOAD_SCRIPT.encode("utf-8"), artifact.body)
+        self.assertEqual(artifact.etag, make_etag(artifact.body))
+        self.assertIn("gzip", artifact.encoded)
+
+    def test_large_binaries_are_served_from_disk(self):
+        path = self.root / "image.webp"
+        path.write_bytes(b"\0" * (MAX_INLINE_BYTES + 1))
+        artifact = load_artifact(path)
+        self.assertIsNone(artifact.body)
+        self.assertEqual(artifact.path, path)
+
+
+class FileHandlerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        root = Path(tmp.name)
+        (root / "post.html").write_text(
+            "<body>" + "x" * MAX_INLINE_BYTES + "</body>", encoding="utf-8"
+        )
+        app = web.Application()
+        app["store"] = ArtifactStore(root)
+        app["store"].refresh()
+        app["lazy"] = None
+        app.router.add_get("/{tail:.*}", file_handler)
+        self.client = TestClient(TestServer(app))
+        await self.client.start_server()
+        self.addAsyncCleanup(self.client.close)
+
+    async def test_large_page_is_served_with_the_reload_script(self):
+        response = await self.client.get(
+            "/post", headers={"Accept-Encoding": "identity"}
+        )
+        body = await response.read()
+        self.assertIn(RELOAD_SCRIPT.encode("utf-8"), body)
+        self.assertEqual(response.headers["ETag"], make_etag(body))
+
+        response = await self.client.get(
+            "/post",
+            headers={
+                "Accept-Encoding": "identity",
+                "If-None-Match": make_etag(body),
+            },
+        )
+        self.assertEqual(response.status, 304)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+"""
+Tests for the resource hints added to post pages.
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from hints import first_image_preload  # noqa: E402
+from minify import minify_html  # noqa: E402
+
+IMG = (
+    '<p><img src="/posts/images/a-png-720.webp" '
+    'srcset="/posts/images/a-png-360.webp 360w, /posts/images/a-png-720.webp 720w" '
+    'sizes="(max-width: 720px) 100vw, 720px" alt="A" /></p>'
+)
+PRELOAD = (
+    '<link rel="preload" href="/posts/images/a-png-720.webp" as="image" '
+    'imagesrcset="/posts/images/a-png-360.webp 360w, /posts/images/a-png-720.webp 720w" '
+    'imagesizes="(max-width: 720px) 100vw, 720px" />'
+)
+
+
+class FirstImagePreloadTest(unittest.TestCase):
+    def test_quoted_attributes(self):
+        self.assertEqual(first_image_preload(IMG), PRELOAD)
+
+    def test_preload_survives_minification(self):
+        minified = minify_html(IMG)
+        self.assertIn("src=/posts/images/a-png-720.webp ", minified)
+        self.assertEqual(first_image_preload(minified), PRELOAD)
+
+    def test_unquoted_src_without_srcset(self):
+        self.assertEqual(
+            first_image_preload("<img src=/a.png alt=x>"),
+            '<link rel="preload" href="/a.png" as="image" />',
+        )
+
+    def test_no_image_worth_preloading(self):
+        self.assertEqual(first_image_preload("<p>text</p>"), "")
+        self.assertEqual(first_image_preload('<img src="data:image/png;base64,">'), "")
+        self.assertEqual(first_image_preload('<img alt="x">'), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,238 @@
+"""
+Tests for the build manifest and the invalidation decisions built on it.
+
+Run from the `blog/` directory:
+
+    uv run python -m unittest discover -s tests
+"""
+
+import json
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from main import (  # noqa: E402
+    Config,
+    Post,
+    build_globals_hash,
+    claim_images,
+    is_post_fresh,
+    markdown_cache_key,
+    prune_images,
+    remove_stale_posts,
+)
+from manifest import (  # noqa: E402
+    MANIFEST_VERSION,
+    BuildManifest,
+    hash_bytes,
+    post_inputs_hash,
+)
+from output import OutputWriter  # noqa: E402
+from render import Template  # noqa: E402
+
+
+class ManifestTestCase(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+
+
+class HashBytesTest(unittest.TestCase):
+    def test_chunks_are_length_prefixed(self):
+        self.assertNotEqual(hash_bytes(b"ab", b"c"), hash_bytes(b"a", b"bc"))
+
+
+class BuildManifestTest(ManifestTestCase):
+    def test_round_trip(self):
+        manifest = BuildManifest(self.root / "m.json", "g", {"a": {"hash": "h"}})
+        manifest.save()
+        loaded = BuildManifest.load(self.root / "m.json")
+        self.assertEqual(loaded.globals_hash, "g")
+        self.assertEqual(loaded.posts, {"a": {"hash": "h"}})
+
+    def test_other_version_is_discarded(self):
+        path = self.root / "m.json"
+        path.write_text(
+            json.dumps(
+                {
+                    "version": MANIFEST_VERSION - 1,
+                    "globals_hash": "g",
+                    "posts": {"a": {}},
+                }
+            )
+        )
+        self.assertEqual(BuildManifest.load(path).posts, {})
+
+    def test_unreadable_manifest_is_empty(self):
+        path = self.root / "m.json"
+        path.write_text("{not json")
+        self.assertEqual(BuildManifest.load(path).posts, {})
+
+    def test_globals_change_drops_every_post(self):
+        manifest = BuildManifest(self.root / "m.json", "old", {"a": {}})
+        manifest.reset_if_globals_changed("old")
+        self.assertEqual(manifest.posts, {"a": {}})
+        manifest.reset_if_globals_changed("new")
+        self.assertEqual(manifest.posts, {})
+        self.assertEqual(manifest.globals_hash, "new")
+
+
+class GlobalsHashTest(unittest.TestCase):
+    def setUp(self):
+        self.template = Template.compile("<main>{{ content }}</main>")
+
+    def globals_hash(self, config: Config) -> str:
+        return build_globals_hash(self.template, "<a>Home</a>", {}, config)
+
+    def test_image_settings_invalidate_every_post(self):
+        base = self.globals_hash(Config())
+        self.assertEqual(base, self.globals_hash(Config()))
+        self.assertNotEqual(base, self.globals_hash(Config(image_widths=(480, 960))))
+        self.assertNotEqual(base, self.globals_hash(Config(image_default_width=360)))
+        self.assertNotEqual(base, self.globals_hash(Config(image_sizes="100vw")))
+
+    def test_listing_settings_do_not(self):
+        self.assertEqual(
+            self.globals_hash(Config()), self.globals_hash(Config(posts_per_page=5))
+        )
+
+
+class MarkdownCacheKeyTest(unittest.TestCase):
+    def assertKeyFollowsPygments(self, md: str, follows: bool = True) -> None:
+        before = markdown_cache_key(md)
+        with mock.patch("pygments.__version__", "0.0"):
+            after = markdown_cache_key(md)
+        self.assertEqual(before != after, follows, md)
+
+    def test_code_blocks_depend_on_the_pygments_version(self):
+        for md in (
+            "```python\na = 1\n```\n",
+            "    a = 1\n",
+            "1. x\n\n   ```python\n   a = 1\n   ```\n",
+            "- x\n\n  ~~~\n  a = 1\n  ~~~\n",
+            "> ```python\n> a = 1\n> ```\n",
+        ):
+            self.assertKeyFollowsPygments(md)
+
+    def test_prose_does_not(self):
+        self.assertKeyFollowsPygments("# Title\n\nSome `code` here.\n", False)
+
+
+class PostInputsHashTest(ManifestTestCase):
+    def setUp(self):
+        super().setUp()
+        self.post_dir = self.root / "post"
+        self.post_dir.mkdir()
+        (self.post_dir / "index.md").write_text("# Title\n")
+
+    def test_matching_stats_reuse_the_recorded_hash(self):
+        _, stats = post_inputs_hash(self.post_dir, None)
+        digest, _ = post_inputs_hash(self.post_dir, {"hash": "recorded", "stat": stats})
+        self.assertEqual(digest, "recorded")
+
+    def test_content_change_is_detected(self):
+        before, stats = post_inputs_hash(self.post_dir, None)
+        (self.post_dir / "index.md").write_text("# Another title\n")
+        after, _ = post_inputs_hash(self.post_dir, {"hash": before, "stat": stats})
+        self.assertNotEqual(before, after)
+
+    def test_new_file_is_detected(self):
+        before, stats = post_inputs_hash(self.post_dir, None)
+        (self.post_dir / "image.png").write_bytes(b"\x89PNG\r\n\x1a\n")
+        after, _ = post_inputs_hash(self.post_dir, {"hash": before, "stat": stats})
+        self.assertNotEqual(before, after)
+
+
+class FreshnessTest(ManifestTestCase):
+    def setUp(self):
+        super().setUp()
+        self.posts_out = self.root / "posts"
+        self.images_out = self.posts_out / "images"
+        self.images_out.mkdir(parents=True)
+        (self.posts_out / "a.html").write_text("<p>a</p>")
+        (self.images_out / "pic-png-360.webp").write_bytes(b"")
+        self.entry = {"hash": "h", "images": {"pic.png": [[360, 240]]}}
+
+    def test_fresh(self):
+        self.assertTrue(
+            is_post_fresh("a", self.entry, "h", self.posts_out, self.images_out)
+        )
+
+    def test_changed_inputs(self):
+        self.assertFalse(
+            is_post_fresh("a", self.entry, "other", self.posts_out, self.images_out)
+        )
+
+    def test_missing_outputs(self):
+        (self.images_out / "pic-png-360.webp").unlink()
+        self.assertFalse(
+            is_post_fresh("a", self.entry, "h", self.posts_out, self.images_out)
+        )
+        self.assertFalse(is_post_fresh("a", None, "h", self.posts_out, self.images_out))
+
+
+class RemoveStalePostsTest(ManifestTestCase):
+    def test_posts_outside_the_build_are_removed(self):
+        posts_out = self.root / "posts"
+        writer = OutputWriter(self.root)
+        for post_code in ("kept", "gone"):
+            writer.write_text(posts_out / f"{post_code}.html", ["<p></p>"], "post")
+        manifest = BuildManifest(self.root / "m.json", posts={"kept": {}, "gone": {}})
+
+        # "gone" may still have a directory; only the parsed posts are live
+        remove_stale_posts(manifest, {"kept"}, posts_out, writer)
+
+        self.assertEqual(set(manifest.posts), {"kept"})
+        self.assertTrue((posts_out / "kept.html").is_file())
+        self.assertFalse((posts_out / "gone.html").exists())
+        self.assertNotIn("posts/gone.html", writer.index)
+
+
+class SharedImagesTest(ManifestTestCase):
+    def make_post(self, post_code: str) -> Post:
+        return Post(
+            code=post_code,
+            title=post_code,
+            date=datetime(2024, 1, 1),
+            tags=[],
+            excerpt="",
+            content_html="",
+            link_path=Path("posts") / f"{post_code}.html",
+            images={"pic.png": [(360, 240)], post_code + ".png": [(360, 240)]},
+        )
+
+    def test_only_the_first_post_publishes_a_shared_name(self):
+        img_set = set()
+        first, second = self.make_post("aaa"), self.make_post("zzz")
+        self.assertEqual(claim_images(first, img_set), ["pic.png", "aaa.png"])
+        self.assertEqual(claim_images(second, img_set), ["zzz.png"])
+        # Both posts still link to the shared image
+        self.assertIn("pic.png", second.images)
+
+    def test_shared_variants_outlive_the_publishing_post(self):
+        images_out = self.root / "images"
+        images_out.mkdir()
+        for name in ("pic-png-360.webp", "aaa-png-360.webp", "zzz-png-360.webp"):
+            (images_out / name).write_bytes(b"")
+        # "aaa" published pic.png and was deleted; "zzz" is cached and links to it
+        zzz = self.make_post("zzz")
+        manifest = BuildManifest(
+            self.root / "m.json", posts={"zzz": {"images": zzz.images}}
+        )
+
+        prune_images(manifest, images_out)
+
+        self.assertEqual(
+            sorted(path.name for path in images_out.iterdir()),
+            ["pic-png-360.webp", "zzz-png-360.webp"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
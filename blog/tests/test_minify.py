@@ -0,0 +1,115 @@
+"""
+Tests for the HTML minifier.
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from minify import bytes_saved, minify_html  # noqa: E402
+
+
+class RawElementsTest(unittest.TestCase):
+    def assertUnchanged(self, html_text: str) -> None:
+        self.assertEqual(minify_html(html_text), html_text)
+
+    def test_pre_is_byte_exact(self):
+        self.assertUnchanged('<pre><code class="x">  a  =  1\n\n\tb </code></pre>')
+
+    def test_inline_code_keeps_its_spaces(self):
+        self.assertEqual(
+            minify_html("<p>a  <code>  b  c </code>  d</p>"),
+            "<p>a <code>  b  c </code> d</p>",
+        )
+
+    def test_mermaid_block_is_byte_exact(self):
+        self.assertUnchanged('<div class="mermaid">\ngraph TD\n  A-->B\n</div>')
+        self.assertUnchanged("<div class=mermaid>\n  A-->B\n</div>")
+
+    def test_script_style_and_textarea_are_byte_exact(self):
+        self.assertUnchanged("<script>if (a  <  b) {  }</script>")
+        self.assertUnchanged("<style>a  >  b { color : red }</style>")
+        self.assertUnchanged("<textarea>  two\n  lines </textarea>")
+
+    def test_comments_inside_raw_elements_survive(self):
+        self.assertUnchanged("<pre><code><!-- kept --></code></pre>")
+
+    def test_highlighter_span_before_code_is_dropped(self):
+        self.assertEqual(
+            minify_html("<pre><span></span><code>x</code></pre>"),
+            "<pre><code>x</code></pre>",
+        )
+
+
+class AttributeQuotesTest(unittest.TestCase):
+    def test_simple_values_lose_their_quotes(self):
+        self.assertEqual(
+            minify_html("<a href=\"/posts/x\" class='tag'>x</a>"),
+            "<a href=/posts/x class=tag>x</a>",
+        )
+
+    def test_values_that_need_quotes_keep_them(self):
+        for tag in (
+            '<a title="two words">x</a>',
+            '<img alt="" src=x>',
+            '<input value="a=b">',
+            '<a title="x > y">q</a>',
+            '<a title="say `hi`">q</a>',
+            '<a title="it\'s">q</a>',
+        ):
+            with self.subTest(tag=tag):
+                self.assertEqual(minify_html(tag), tag)
+
+    def test_trailing_slash_keeps_quotes(self):
+        # href=a/> would read as a self-closing tag
+        self.assertEqual(minify_html('<a href="a/">y</a>'), '<a href="a/">y</a>')
+
+    def test_value_before_self_closing_slash_keeps_quotes(self):
+        self.assertEqual(
+            minify_html('<img src="/a.png" alt="x"/>'), '<img src=/a.png alt="x"/>'
+        )
+
+    def test_whitespace_between_attributes_collapses(self):
+        self.assertEqual(
+            minify_html('<a\n  href="/x"\n  title="a b"  >x</a>'),
+            '<a href=/x title="a b">x</a>',
+        )
+
+
+class WhitespaceTest(unittest.TestCase):
+    def test_block_tags_drop_surrounding_whitespace(self):
+        self.assertEqual(
+            minify_html('<div class="a b">\n  <p>Hello   <b>world</b> !</p>\n</div>'),
+            '<div class="a b"><p>Hello <b>world</b> !</p></div>',
+        )
+
+    def test_inline_whitespace_shrinks_to_one_space(self):
+        self.assertEqual(
+            minify_html("<p><em>a</em>\n\n<em>b</em></p>"),
+            "<p><em>a</em> <em>b</em></p>",
+        )
+
+    def test_no_break_spaces_are_kept(self):
+        self.assertEqual(minify_html("<p>a\xa0\xa0b</p>"), "<p>a\xa0\xa0b</p>")
+
+    def test_comments_and_empty_spans_are_dropped(self):
+        self.assertEqual(
+            minify_html('<!-- note --><p>x<span class="w"></span></p>'), "<p>x</p>"
+        )
+
+    def test_conditional_comments_are_kept(self):
+        self.assertEqual(
+            minify_html("<!--[if IE]>x<![endif]--><p>y</p>"),
+            "<!--[if IE]>x<![endif]--><p>y</p>",
+        )
+
+
+class BytesSavedTest(unittest.TestCase):
+    def test_counts_utf8_bytes(self):
+        self.assertEqual(bytes_saved("é  ", "é"), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
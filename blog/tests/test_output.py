@@ -0,0 +1,68 @@
+"""
+Tests for the change-aware output writer.
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from output import OutputWriter  # noqa: E402
+
+
+class OutputWriterTestCase(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        self.writer = OutputWriter(self.root / "build")
+
+
+class WriteTextTest(OutputWriterTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = self.root / "build" / "posts" / "a.html"
+
+    def test_new_and_changed_content_is_written(self):
+        self.assertTrue(self.writer.write_text(self.path, ["<p>", "a</p>"]))
+        self.assertTrue(self.writer.write_text(self.path, ["<p>b</p>"]))
+        self.assertEqual(self.path.read_text(), "<p>b</p>")
+        self.assertEqual(self.writer.written, 2)
+
+    def test_unchanged_content_is_not_written(self):
+        self.writer.write_text(self.path, ["<p>a</p>"])
+        mtime = self.path.stat().st_mtime_ns
+        with mock.patch("output.tempfile.mkstemp") as mkstemp:
+            self.assertFalse(self.writer.write_text(self.path, ["<p>", "a</p>"]))
+        mkstemp.assert_not_called()
+        self.assertEqual(self.path.stat().st_mtime_ns, mtime)
+        self.assertEqual(self.writer.skipped, 1)
+
+
+class SyncFileTest(OutputWriterTestCase):
+    def setUp(self):
+        super().setUp()
+        self.src = self.root / "styles.css"
+        self.src.write_text("a {}")
+        self.dst = self.root / "build" / "styles.0123456789.css"
+
+    def test_copy_is_not_a_hardlink(self):
+        self.assertTrue(self.writer.sync_file(self.src, self.dst, "fingerprint"))
+        self.assertFalse(self.src.samefile(self.dst))
+
+        # Editing the source in place must not reach the published file
+        with open(self.src, "r+") as fh:
+            fh.write("b")
+        self.assertEqual(self.dst.read_text(), "a {}")
+
+    def test_unchanged_source_is_skipped(self):
+        self.writer.sync_file(self.src, self.dst)
+        self.assertFalse(self.writer.sync_file(self.src, self.dst))
+        self.assertEqual(self.writer.skipped, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""
+Tests for code-block line numbering.
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from render import add_line_numbers  # noqa: E402
+
+OPEN = '<div class="codehilite"><pre><span></span><code>'
+CLOSE = "</code></pre></div>"
+
+
+def ln(i: int) -> str:
+    return f'<span class="ln">{i}</span>'
+
+
+class AddLineNumbersTest(unittest.TestCase):
+    def test_plain_blocks(self):
+        self.assertEqual(
+            add_line_numbers("<p>x</p><pre><code>a\nb\n</code></pre>"),
+            f"<p>x</p>{OPEN}{ln(1)}a\n{ln(2)}b{CLOSE}",
+        )
+
+    def test_highlighted_block_with_nested_spans(self):
+        html_content = (
+            '<div class="codehilite">\n<pre><span></span><code>'
+            '<span class="k">def</span> <span class="nf">f</span>'
+            '<span class="p">():</span>\n'
+            '    <span class="s2">&quot;&quot;&quot;a\nb&quot;&quot;&quot;</span>\n'
+            "</code></pre>\n</div>"
+        )
+        self.assertEqual(
+            add_line_numbers(html_content),
+            f'{OPEN}{ln(1)}<span class="k">def</span> <span class="nf">f</span>'
+            f'<span class="p">():</span>\n'
+            f'{ln(2)}    <span class="s2">&quot;&quot;&quot;a\n'
+            f"{ln(3)}b&quot;&quot;&quot;</span>{CLOSE}",
+        )
+
+    def test_every_block_is_numbered_from_one(self):
+        numbered = add_line_numbers(
+            '<pre><code>a</code></pre><div class="codehilite"><pre><span></span>'
+            "<code>b\nc</code></pre></div><pre><code>d</code></pre>"
+        )
+        self.assertEqual(
+            numbered,
+            f"{OPEN}{ln(1)}a{CLOSE}{OPEN}{ln(1)}b\n{ln(2)}c{CLOSE}{OPEN}{ln(1)}d{CLOSE}",
+        )
+
+    def test_idempotent(self):
+        once = add_line_numbers("<pre><code>a\nb</code></pre><p>c</p>")
+        self.assertEqual(add_line_numbers(once), once)
+
+    def test_unterminated_blocks_are_left_alone(self):
+        for html_content in ("<pre><code>a", '<div class="codehilite"><pre>x</pre>'):
+            with self.subTest(html_content=html_content):
+                self.assertEqual(add_line_numbers(html_content), html_content)
+
+
+if __name__ == "__main__":
+    unittest.main()
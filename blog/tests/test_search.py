@@ -0,0 +1,141 @@
+"""
+Tests for search tokenization and the sharded search index.
+"""
+
+import json
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from main import PostMeta, search_doc  # noqa: E402
+from output import OutputWriter  # noqa: E402
+from search import (  # noqa: E402
+    SEARCH_DIR,
+    SEARCH_INDEX_NAME,
+    SearchState,
+    delta_encode,
+    post_terms,
+    shard_key,
+    stem,
+    tokenize,
+    update_search_index,
+)
+
+
+class TokenizeTest(unittest.TestCase):
+    def test_stemming(self):
+        self.assertEqual(stem("caching"), "cach")
+        self.assertEqual(stem("queries"), "query")
+        self.assertEqual(stem("relational"), "relate")
+        self.assertEqual(stem("organization"), "organize")
+
+    def test_words_ending_in_s_that_are_not_plurals(self):
+        for word in ("class", "status", "analysis"):
+            self.assertEqual(stem(word), word)
+
+    def test_stems_are_never_too_short(self):
+        self.assertEqual(stem("bed"), "bed")
+        self.assertEqual(stem("is"), "is")
+
+    def test_stopwords_punctuation_and_short_tokens_are_dropped(self):
+        self.assertEqual(
+            tokenize("The Caching of Queries, in Python's AST_node!"),
+            ["cach", "query", "python", "ast", "node"],
+        )
+
+    def test_unicode_words(self):
+        self.assertEqual(tokenize("Café naïve"), ["café", "naïve"])
+
+    def test_long_terms_are_truncated(self):
+        self.assertEqual(tokenize("x" * 100), ["x" * 32])
+
+
+class PostTermsTest(unittest.TestCase):
+    def test_title_and_tags_are_boosted(self):
+        terms = post_terms("Graphs", ["Python"], "<p>graphs and python</p>")
+        self.assertEqual(terms, {"graph": 6, "python": 6})
+
+    def test_code_blocks_are_skipped_and_entities_decoded(self):
+        terms = post_terms(
+            "", [], "<p>Tom &amp; Jerry</p><pre><code>secret</code></pre>"
+        )
+        self.assertEqual(terms, {"jerry": 1, "tom": 1})
+
+
+class DeltaEncodeTest(unittest.TestCase):
+    def test_gaps_between_sorted_ids(self):
+        self.assertEqual(delta_encode([(7, 1), (2, 3), (3, 2)]), [2, 3, 1, 2, 4, 1])
+
+
+class UpdateSearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        self.index_dir = self.root / SEARCH_DIR
+        self.state = SearchState(self.root / ".search-terms.json")
+        self.docs = {
+            "a": ["/posts/a", "A", "2024-01-01", ""],
+            "b": ["/posts/b", "B", "2024-01-02", ""],
+        }
+        self.update({"a": {"alpha": 1, "graph": 2}, "b": {"beta": 3, "graph": 1}})
+
+    def update(self, changed, docs=None):
+        writer = OutputWriter(self.root)
+        update_search_index(self.state, changed, docs or self.docs, self.root, writer)
+        writer.save()
+
+    def read(self, name: str) -> dict:
+        return json.loads((self.index_dir / name).read_text(encoding="utf-8"))
+
+    def test_terms_are_sharded_by_prefix(self):
+        index = self.read(SEARCH_INDEX_NAME)
+        self.assertEqual(index["shards"], ["al", "be", "gr"])
+        self.assertEqual(set(index["docs"]), {"0", "1"})
+        self.assertEqual(self.read("gr.json"), {"graph": [0, 2, 1, 1]})
+        self.assertEqual(shard_key("graph"), "gr")
+
+    def test_only_affected_shards_are_rewritten(self):
+        (self.index_dir / "al.json").write_text("untouched")
+        self.update({"b": {"beta": 3, "bravo": 1}})
+
+        self.assertEqual((self.index_dir / "al.json").read_text(), "untouched")
+        self.assertEqual(self.read("be.json"), {"beta": [1, 3]})
+        self.assertEqual(self.read("br.json"), {"bravo": [1, 1]})
+        self.assertEqual(self.read("gr.json"), {"graph": [0, 2]})
+
+    def test_removed_posts_drop_their_shards(self):
+        self.update({}, {"a": self.docs["a"]})
+
+        self.assertFalse((self.index_dir / "be.json").exists())
+        self.assertEqual(self.read("gr.json"), {"graph": [0, 2]})
+        self.assertEqual(set(self.read(SEARCH_INDEX_NAME)["docs"]), {"0"})
+
+    def test_ids_are_not_reused(self):
+        self.update({}, {"a": self.docs["a"]})
+        self.update({"c": {"gamma": 1}}, {"a": self.docs["a"], "c": self.docs["b"]})
+        self.assertEqual(self.state.posts["c"]["id"], 2)
+
+
+class SearchDocTest(unittest.TestCase):
+    def test_excerpt_entities_are_decoded(self):
+        post = PostMeta(
+            code="a",
+            title="Tom & Jerry",
+            date=datetime(2024, 5, 6),
+            tags=[],
+            excerpt="Tom &amp; Jerry &lt;3",
+            link_path=Path("posts") / "a.html",
+        )
+        self.assertEqual(
+            search_doc(post),
+            ["/posts/a", "Tom & Jerry", "2024-05-06", "Tom & Jerry <3"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Tests for tag slugs and the per-tag listing index.
+"""
+
+import sys
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from main import PostMeta, build_tag_index, tag_slug  # noqa: E402
+
+
+def make_post(code: str, tags: list) -> PostMeta:
+    return PostMeta(
+        code=code,
+        title=code,
+        date=datetime(2024, 1, 1),
+        tags=tags,
+        excerpt="",
+        link_path=Path("posts") / f"{code}.html",
+    )
+
+
+class TagSlugTest(unittest.TestCase):
+    def test_readable_tags_keep_their_name(self):
+        self.assertEqual(tag_slug("python"), "python")
+        self.assertEqual(tag_slug("Machine Learning"), "machine-learning")
+        self.assertEqual(tag_slug("web3"), "web3")
+
+    def test_case_and_whitespace_variants_share_a_slug(self):
+        self.assertEqual(tag_slug(" Python "), tag_slug("python"))
+        self.assertEqual(tag_slug("Machine  Learning"), tag_slug("machine-learning"))
+
+    def test_lossy_tags_do_not_collide(self):
+        slugs = {
+            tag_slug(tag)
+            for tag in (
+                "C",
+                "C++",
+                "C#",
+                "c-",
+                "a_b",
+                "a-b",
+                "café",
+                "日本語",
+                "한국어",
+            )
+        }
+        self.assertEqual(len(slugs), 9)
+
+    def test_slugs_are_url_safe(self):
+        for tag in ("C++", "C#", "café", "日本語", "a/b", "", "--"):
+            slug = tag_slug(tag)
+            self.assertRegex(slug, r"^[a-z0-9]+(?:-{1,2}[a-z0-9]+)*$", tag)
+
+    def test_lossy_slugs_are_marked(self):
+        self.assertTrue(tag_slug("C++").startswith("c--"))
+        self.assertTrue(tag_slug("日本語").startswith("tag--"))
+        self.assertNotIn("--", tag_slug("machine-learning"))
+
+
+class BuildTagIndexTest(unittest.TestCase):
+    def test_groups_posts_in_order(self):
+        first, second = make_post("a", ["python", "ai"]), make_post("b", ["python"])
+        index = build_tag_index([first, second])
+        self.assertEqual(index["python"], ("python", [first, second]))
+        self.assertEqual(index["ai"], ("ai", [first]))
+
+    def test_spelling_variants_are_one_listing(self):
+        first, second = make_post("a", ["Python", "python"]), make_post("b", ["PYTHON"])
+        index = build_tag_index([first, second])
+        self.assertEqual(index["python"], ("Python", [first, second]))
+
+    def test_similar_tags_stay_apart(self):
+        cpp, csharp = make_post("a", ["C++"]), make_post("b", ["C#"])
+        index = build_tag_index([cpp, csharp])
+        self.assertEqual(index[tag_slug("C++")], ("C++", [cpp]))
+        self.assertEqual(index[tag_slug("C#")], ("C#", [csharp]))
+
+    def test_slug_collision_is_reported(self):
+        posts = [make_post("a", ["C++"]), make_post("b", ["C#"])]
+        with mock.patch("main.tag_slug", return_value="c"):
+            with self.assertRaises(ValueError):
+                build_tag_index(posts)
+
+
+if __name__ == "__main__":
+    unittest.main()